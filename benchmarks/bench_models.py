@@ -0,0 +1,93 @@
+"""Compare the memory held by slotted, interned models with the previous plain dataclasses.
+
+Run from the repository root:
+
+    python benchmarks/bench_models.py
+"""
+
+from __future__ import annotations
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from knotly.models import Link, Turn  # noqa: E402
+
+
+@dataclass
+class PlainLink:
+    text: str
+    href: str
+
+
+@dataclass
+class PlainTurn:
+    turn_index: int
+    turn_id: Optional[str]
+    role: str
+    author: Optional[str]
+    content: str
+    raw_content: Optional[str]
+    created_at: Optional[datetime]
+    data_turn: Optional[str] = None
+    links: List[PlainLink] = field(default_factory=list)
+    mnemonic: str = ""
+
+
+def parsed(value: str) -> str:
+    # Attribute values come out of the HTML parser as fresh strings on every turn.
+    return "".join(list(value))
+
+
+def build_turns(turn_class, link_class, count: int, contents: List[str]) -> list:
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    turns = []
+    for index in range(count):
+        role = parsed("user" if index % 2 == 0 else "assistant")
+        turns.append(
+            turn_class(
+                turn_index=index + 1,
+                turn_id=f"msg-{index}",
+                role=role,
+                author=parsed("You" if role == "user" else "ChatGPT"),
+                content=contents[index],
+                raw_content=None,
+                created_at=created_at,
+                data_turn=parsed(role),
+                links=[link_class(text="docs", href=f"https://example.com/{index}")] if index % 3 == 0 else [],
+                mnemonic=f"turn-{index}",
+            )
+        )
+    return turns
+
+
+def measure(label: str, build: Callable[[], list], count: int) -> int:
+    gc.collect()
+    tracemalloc.start()
+    turns = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<30} {current / 1024:10.1f} KiB {current / count:8.1f} B/turn")
+    del turns
+    return current
+
+
+def main() -> None:
+    count = 50_000
+    # Shared content strings so the comparison shows model overhead, not text.
+    contents = [f"Turn {index} text" for index in range(count)]
+
+    print(f"{count} turns (one link on every third turn)")
+    plain = measure("plain dataclasses", lambda: build_turns(PlainTurn, PlainLink, count, contents), count)
+    slotted = measure("slotted + interned", lambda: build_turns(Turn, Link, count, contents), count)
+    print(f"{'saved per turn':<30} {'':>14} {(plain - slotted) / count:8.1f} B/turn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare the explicit-stack traversal core with the previous recursive Node methods.
+
+Run from the repository root:
+
+    python benchmarks/bench_traversal.py
+"""
+
+from __future__ import annotations
+
+import sys
+import timeit
+from pathlib import Path
+from typing import List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from knotly.parsers.html_input import NEWLINE_RUN_RE, Node, _collect_text, _place_rendered  # noqa: E402
+
+
+def recursive_find_all(node: Node, predicate) -> List[Node]:
+    matches = []
+    if predicate(node):
+        matches.append(node)
+    for child in node.children:
+        matches.extend(recursive_find_all(child, predicate))
+    return matches
+
+
+def recursive_find_first(node: Node, predicate) -> Optional[Node]:
+    if predicate(node):
+        return node
+    for child in node.children:
+        found = recursive_find_first(child, predicate)
+        if found:
+            return found
+    return None
+
+
+def recursive_iter_text(node: Node) -> List[str]:
+    pieces: List[str] = []
+    for item in node._contents:
+        if isinstance(item, str):
+            pieces.append(item)
+        else:
+            pieces.extend(recursive_iter_text(item))
+    return pieces
+
+
+def recursive_collect_text(node: Node) -> str:
+    def render(current: Node) -> str:
+        pieces: List[str] = []
+        for item in current._contents:
+            if isinstance(item, str):
+                pieces.append(item)
+            else:
+                _place_rendered(pieces, item, render(item))
+        return "".join(pieces)
+
+    return NEWLINE_RUN_RE.sub("\n\n", render(node)).strip()
+
+
+def build_wide(sections: int, paragraphs: int) -> Node:
+    root = Node(tag="div", attrs={"class": "message-content"})
+    for section in range(sections):
+        block = Node(tag="section", attrs={}, parent=root)
+        root.add_child(block)
+        for paragraph in range(paragraphs):
+            p = Node(tag="p", attrs={}, parent=block)
+            block.add_child(p)
+            p.add_text(f"Paragraph {section}.{paragraph} with ")
+            link = Node(tag="a", attrs={"href": f"https://example.com/{section}/{paragraph}"}, parent=p)
+            p.add_child(link)
+            link.add_text("a link")
+    return root
+
+
+def build_deep(depth: int) -> Node:
+    root = current = Node(tag="div", attrs={})
+    for level in range(depth):
+        child = Node(tag="span" if level % 2 else "div", attrs={}, parent=current)
+        current.add_child(child)
+        current = child
+    current.add_text("bottom")
+    return root
+
+
+def bench(label: str, statement, number: int) -> None:
+    seconds = min(timeit.repeat(statement, number=number, repeat=5)) / number
+    print(f"{label:<40} {seconds * 1000:9.3f} ms")
+
+
+def main() -> None:
+    wide = build_wide(200, 50)
+    is_link = lambda n: n.tag == "a"  # noqa: E731
+    is_last = lambda n: n.attrs.get("href", "").endswith("/199/49")  # noqa: E731
+
+    print("Wide tree (10k paragraphs)")
+    bench("find_all recursive", lambda: recursive_find_all(wide, is_link), 20)
+    bench("find_all iterative", lambda: wide.find_all(is_link), 20)
+    bench("find_first recursive (last node)", lambda: recursive_find_first(wide, is_last), 20)
+    bench("find_first iterative (last node)", lambda: wide.find_first(is_last), 20)
+    bench("find_first iterative (first link)", lambda: wide.find_first(is_link), 20)
+    bench("iter_text recursive", lambda: recursive_iter_text(wide), 20)
+    bench("iter_text iterative", lambda: wide.iter_text(), 20)
+    bench("_collect_text recursive", lambda: recursive_collect_text(wide), 5)
+    bench("_collect_text iterative", lambda: _collect_text(wide), 5)
+
+    depth = 100_000
+    deep = build_deep(depth)
+    print(f"Deep tree ({depth} levels)")
+    for label, recursive in (("iter_text", recursive_iter_text), ("_collect_text", recursive_collect_text)):
+        try:
+            recursive(deep)
+        except RecursionError:
+            print(f"{label + ' recursive':<40} RecursionError")
+    bench("iter_text iterative", lambda: deep.iter_text(), 3)
+    bench("find_all iterative", lambda: deep.find_all(is_link), 3)
+    bench("_collect_text iterative", lambda: _collect_text(deep), 3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator, List, Mapping, Optional
+
+HASH_CHUNK_SIZE = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    input_hash TEXT NOT NULL,
+    options_hash TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_dir TEXT NOT NULL,
+    parent_name TEXT NOT NULL,
+    title TEXT NOT NULL,
+    turn_count INTEGER NOT NULL,
+    parse_seconds REAL NOT NULL,
+    write_seconds REAL NOT NULL,
+    processed_at TEXT NOT NULL,
+    PRIMARY KEY (input_hash, options_hash)
+);
+CREATE TABLE IF NOT EXISTS index_notes (
+    note_path TEXT NOT NULL,
+    parent_path TEXT NOT NULL,
+    PRIMARY KEY (note_path, parent_path)
+);
+"""
+
+
+@dataclass
+class CatalogEntry:
+    input_hash: str
+    options_hash: str
+    input_path: str
+    output_dir: str
+    parent_name: str
+    title: str
+    turn_count: int
+    parse_seconds: float
+    write_seconds: float
+    processed_at: str
+
+    @property
+    def parent_path(self) -> Path:
+        return Path(self.output_dir) / self.parent_name
+
+
+class Catalog:
+    """SQLite record of converted inputs keyed by content hash and option fingerprint."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path))
+        self.connection.executescript(SCHEMA)
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def lookup(self, input_hash: str, options_hash: str) -> Optional[CatalogEntry]:
+        row = self.connection.execute(
+            "SELECT * FROM conversions WHERE input_hash = ? AND options_hash = ?",
+            (input_hash, options_hash),
+        ).fetchone()
+        return CatalogEntry(*row) if row else None
+
+    def record(self, entry: CatalogEntry) -> None:
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO conversions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    entry.input_hash,
+                    entry.options_hash,
+                    entry.input_path,
+                    entry.output_dir,
+                    entry.parent_name,
+                    entry.title,
+                    entry.turn_count,
+                    entry.parse_seconds,
+                    entry.write_seconds,
+                    entry.processed_at,
+                ),
+            )
+
+    def entries(self) -> List[CatalogEntry]:
+        rows = self.connection.execute("SELECT * FROM conversions ORDER BY processed_at, input_path")
+        return [CatalogEntry(*row) for row in rows]
+
+    def update_index_note(self, note_path: Path, entry: CatalogEntry) -> None:
+        """Add ``entry`` to the vault index note, appending rather than rewriting when possible.
+
+        An output that is already listed has its line replaced when the title changed.
+        """
+        key = str(note_path.resolve())
+        with self.connection:
+            if not note_path.exists():
+                self.connection.execute("DELETE FROM index_notes WHERE note_path = ?", (key,))
+                lines = ["# Conversations", ""]
+                for listed in self._latest_per_output():
+                    lines.append(index_line(note_path, listed))
+                    self._mark_indexed(key, listed)
+                note_path.parent.mkdir(parents=True, exist_ok=True)
+                note_path.write_text("\n".join(lines) + "\n", encoding="utf-8", newline="\n")
+                return
+
+            line = index_line(note_path, entry)
+            if not self._mark_indexed(key, entry):
+                lines = note_path.read_text(encoding="utf-8").splitlines()
+                prefix = line.split("|", 1)[0] + "|"
+                listed = next((idx for idx, existing in enumerate(lines) if existing.startswith(prefix)), None)
+                if listed is not None:
+                    if lines[listed] != line:
+                        lines[listed] = line
+                        note_path.write_text("\n".join(lines) + "\n", encoding="utf-8", newline="\n")
+                    return
+            with note_path.open("a", encoding="utf-8", newline="\n") as handle:
+                handle.write(line + "\n")
+
+    def _mark_indexed(self, key: str, entry: CatalogEntry) -> bool:
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO index_notes VALUES (?, ?)",
+            (key, str(entry.parent_path.resolve())),
+        )
+        return cursor.rowcount > 0
+
+    def _latest_per_output(self) -> Iterator[CatalogEntry]:
+        latest = {}
+        for entry in self.entries():
+            latest[str(entry.parent_path.resolve())] = entry
+        return iter(latest.values())
+
+
+def index_line(note_path: Path, entry: CatalogEntry) -> str:
+    target = Path(os.path.relpath(entry.parent_path.resolve(), note_path.parent.resolve()))
+    title = " ".join(entry.title.split()).replace("|", "-").replace("]]", "")
+    return f"- [[{target.as_posix()}|{title}]]"
+
+
+def hash_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_fingerprint(options: Mapping[str, object]) -> str:
+    encoded = json.dumps(options, sort_keys=True, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def utc_now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
@@ -1,40 +1,288 @@
 from __future__ import annotations
 
 import argparse
+import os
+import sys
 from pathlib import Path
+from typing import Dict, Optional
 
+from .catalog import Catalog
 from .console import Console
-from .pipeline import build_conversation
+from .parsers import (
+    CONTENT_FORMATS,
+    DEFAULT_PROFILE,
+    PROFILES,
+    ExtractorProfile,
+    LayoutTable,
+    ResourceLimitExceeded,
+    ResourceLimits,
+    TurnSelection,
+    load_profile,
+    parse_roles,
+    parse_turn_ranges,
+)
+from .pipeline import BuildResult, build_cataloged, build_conversation, build_export, stream_conversation
+from .renderers.template import compile_parent_template, compile_turn_template
+from .writers import ARCHIVE_FORMATS, STDOUT, archive_format_for
 
-console = Console()
 
-
-def build_command(args: argparse.Namespace) -> None:
+def build_command(args: argparse.Namespace, console: Optional[Console] = None) -> None:
+    if console is None:
+        console = command_console(args)
     in_path = Path(args.in_path)
     if not in_path.exists():
         raise SystemExit(f"Input path {in_path} does not exist")
 
+    if in_path.is_file() and in_path.suffix.lower() == ".json":
+        export_command(args, in_path, console)
+        return
+
+    if args.format == "jsonl":
+        if in_path.is_dir() or args.catalog:
+            raise SystemExit("Directory input and --catalog require markdown output")
+        jsonl_command(args, in_path, console)
+        return
+
+    archive_format = args.archive or archive_format_for(Path(args.out))
+    if archive_format and (in_path.is_dir() or args.catalog):
+        raise SystemExit("Archive output supports a single input file without --catalog")
+
     output_dir = Path(args.out)
-    if args.vault_root:
+    if args.vault_root and output_dir != STDOUT:
         output_dir = Path(args.vault_root) / output_dir
 
-    result = build_conversation(
-        input_path=in_path,
-        output_dir=output_dir,
+    if in_path.is_dir():
+        # Batch mode: one output folder per saved page, named after the page.
+        inputs = [(path, output_dir / path.stem) for path in sorted(in_path.glob("*.html"))]
+        index_base = output_dir
+    else:
+        inputs = [(in_path, output_dir)]
+        index_base = output_dir.parent
+    if args.vault_root:
+        index_base = Path(args.vault_root)
+
+    options = dict(
         title=args.title,
         parent_name=args.parent_name,
         force=args.force,
         dry_run=args.dry_run,
         timezone=args.timezone,
         by_title=args.by_title,
+        prescan=args.prescan,
+        profile=args.profile_file or args.profile,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        selection=turn_selection(args),
+        content_format=args.content_format,
+        knots=args.knots,
+        limits=resource_limits(args),
+        layouts=layout_table(args),
         verbose=args.verbose,
+        console=console,
+        **read_templates(args),
     )
+    if archive_format:
+        options["archive_format"] = archive_format
+
+    if not args.catalog:
+        for source, target in inputs:
+            result = build_conversation(input_path=source, output_dir=target, **options)
+            save_layouts(options)
+            report_build(args, result, target, console)
+        return
+
+    with Catalog(Path(args.catalog)) as catalog:
+        for source, target in inputs:
+            result = build_cataloged(
+                catalog,
+                input_path=source,
+                output_dir=target,
+                index_note=index_base / args.index_note,
+                **options,
+            )
+            save_layouts(options)
+            if result is None:
+                console.print(f"Skipped {source}: already converted")
+            else:
+                report_build(args, result, target, console)
+
+
+def command_console(args: argparse.Namespace) -> Console:
+    # Exported data owns stdout; keep progress messages out of the stream.
+    return Console(sys.stderr if args.out == "-" else None)
+
 
+def report_build(args: argparse.Namespace, result: BuildResult, output_dir: Path, console: Console) -> None:
     if args.dry_run:
         console.print("Dry run. Files that would be written:")
         console.print(result.plan.summary())
     else:
-        console.print(f"Wrote {len(result.plan.files)} files to {output_dir}")
+        destination = "stdout" if output_dir == STDOUT else output_dir
+        console.print(f"Wrote {len(result.plan.files)} files to {destination}")
+
+
+def export_command(args: argparse.Namespace, in_path: Path, console: Console) -> None:
+    if args.format != "markdown" or args.catalog or args.archive or args.out == "-":
+        raise SystemExit("ChatGPT data exports are converted to markdown folders only")
+
+    output_dir = Path(args.out)
+    if args.vault_root:
+        output_dir = Path(args.vault_root) / output_dir
+
+    results = build_export(
+        input_path=in_path,
+        output_dir=output_dir,
+        parent_name=args.parent_name,
+        force=args.force,
+        dry_run=args.dry_run,
+        timezone=args.timezone,
+        shard_size=args.shard_size,
+        selection=turn_selection(args),
+        knots=args.knots,
+        workers=args.workers,
+        limits=resource_limits(args),
+        verbose=args.verbose,
+        console=console,
+        **read_templates(args),
+    )
+
+    files = sum(result.file_count for result in results)
+    if args.dry_run:
+        console.print(f"Dry run. Would write {len(results)} conversations ({files} files) to {output_dir}")
+    else:
+        console.print(f"Wrote {len(results)} conversations ({files} files) to {output_dir}")
+
+
+def read_templates(args: argparse.Namespace) -> Dict[str, Optional[str]]:
+    """Load and validate the note templates up front so mistakes fail before any output."""
+    templates: Dict[str, Optional[str]] = {}
+    for name, compile_template in (
+        ("turn_template", compile_turn_template),
+        ("parent_template", compile_parent_template),
+    ):
+        path = getattr(args, name)
+        if not path:
+            templates[name] = None
+            continue
+        try:
+            text = Path(path).read_text(encoding="utf-8")
+            compile_template(text)
+        except (OSError, ValueError) as exc:
+            raise SystemExit(f"Invalid {name.replace('_', ' ')} {path}: {exc}")
+        templates[name] = text
+    return templates
+
+
+def turn_selection(args: argparse.Namespace) -> Optional[TurnSelection]:
+    if not args.turns and not args.roles:
+        return None
+    return TurnSelection(ranges=args.turns or (), roles=args.roles or ())
+
+
+def resource_limits(args: argparse.Namespace) -> ResourceLimits:
+    return ResourceLimits(
+        max_input_bytes=args.max_input_bytes,
+        max_nodes=args.max_nodes,
+        max_depth=args.max_depth,
+        max_turn_chars=args.max_turn_chars,
+        time_budget=args.time_budget,
+    )
+
+
+def layout_table(args: argparse.Namespace) -> Optional[LayoutTable]:
+    return LayoutTable(Path(args.layout_cache)) if args.layout_cache else None
+
+
+def save_layouts(options: Dict[str, object]) -> None:
+    # Saved after every page so a batch keeps what it learned if a later page fails.
+    layouts = options.get("layouts")
+    if layouts is not None:
+        layouts.save()
+
+
+def jsonl_command(args: argparse.Namespace, in_path: Path, console: Console) -> None:
+    options = dict(
+        input_path=in_path,
+        title=args.title,
+        timezone=args.timezone,
+        by_title=args.by_title,
+        prescan=args.prescan,
+        profile=args.profile_file or args.profile,
+        workers=args.workers,
+        selection=turn_selection(args),
+        content_format=args.content_format,
+        limits=resource_limits(args),
+        layouts=layout_table(args),
+        verbose=args.verbose,
+        console=console,
+    )
+    if args.dry_run:
+        # Records are produced and counted as usual, but nothing is written.
+        with open(os.devnull, "w", encoding="utf-8") as stream:
+            count = stream_conversation(stream=stream, **options)
+        save_layouts(options)
+        destination = "stdout" if args.out == "-" else args.out
+        console.print(f"Dry run. Would write {count} turns to {destination}")
+        return
+
+    if args.out == "-":
+        stream_conversation(stream=sys.stdout, **options)
+        save_layouts(options)
+        return
+
+    out_path = Path(args.out)
+    if args.vault_root:
+        out_path = Path(args.vault_root) / out_path
+    if out_path.exists() and not args.force:
+        raise FileExistsError(
+            f"Output would overwrite existing files: {out_path}. Use --force to overwrite these files."
+        )
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", encoding="utf-8", newline="\n") as stream:
+        count = stream_conversation(stream=stream, **options)
+    save_layouts(options)
+    console.print(f"Wrote {count} turns to {out_path}")
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"expected a positive integer, got {value}")
+    return number
+
+
+def argument_type(parse):
+    """Adapt a parser raising ``ValueError`` into an argparse ``type``."""
+
+    def convert(value: str):
+        try:
+            return parse(value)
+        except ValueError as exc:
+            raise argparse.ArgumentTypeError(str(exc))
+
+    convert.__name__ = parse.__name__
+    return convert
+
+
+def profile_name(value: str) -> str:
+    # Checked when arguments are parsed, so profiles registered by plugins are accepted too.
+    if value not in PROFILES:
+        raise ValueError(f"unknown profile {value!r} (known: {', '.join(sorted(PROFILES))})")
+    return value
+
+
+def profile_file(value: str) -> ExtractorProfile:
+    try:
+        return load_profile(Path(value))
+    except OSError as exc:
+        raise ValueError(f"cannot read profile file: {exc}") from None
+
+
+def positive_float(value: str) -> float:
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value}")
+    return number
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -46,9 +294,30 @@ def build_parser() -> argparse.ArgumentParser:
         "--in",
         dest="in_path",
         required=True,
-        help="Input file path (saved ChatGPT HTML page)",
+        help="Saved ChatGPT HTML page, a folder of pages, or a ChatGPT data export conversations.json",
+    )
+    parser.add_argument(
+        "--out",
+        dest="out",
+        required=True,
+        help=(
+            "Output directory, or an archive (.zip, .tar, .tar.gz, .tgz, .tar.bz2, .tar.xz) "
+            "for markdown; a file for jsonl; '-' streams to stdout"
+        ),
+    )
+    parser.add_argument(
+        "--archive",
+        dest="archive",
+        choices=ARCHIVE_FORMATS,
+        help="Write markdown notes into a single archive of this format instead of a folder",
+    )
+    parser.add_argument(
+        "--format",
+        dest="format",
+        choices=["markdown", "jsonl"],
+        default="markdown",
+        help="Output format: Markdown notes or one JSON record per line",
     )
-    parser.add_argument("--out", dest="out", required=True, help="Output directory")
     parser.add_argument("--title", dest="title", help="Override conversation title")
     parser.add_argument("--vault-root", dest="vault_root", help="Optional Obsidian vault root")
     parser.add_argument(
@@ -57,6 +326,39 @@ def build_parser() -> argparse.ArgumentParser:
         default="Conversation.md",
         help="Parent index filename",
     )
+    parser.add_argument(
+        "--shard-size",
+        dest="shard_size",
+        type=positive_int,
+        help="Split the parent index into range sub-indexes of this many turns",
+    )
+    parser.add_argument(
+        "--turn-template",
+        dest="turn_template",
+        help="Template file for turn notes, with {{field}} or {{field|yaml}} placeholders",
+    )
+    parser.add_argument(
+        "--parent-template",
+        dest="parent_template",
+        help="Template file for the parent index note",
+    )
+    parser.add_argument(
+        "--turns",
+        dest="turns",
+        type=argument_type(parse_turn_ranges),
+        help="Only extract these turn numbers, e.g. 500-800 or 1-10,42,900- (numbering is unchanged)",
+    )
+    parser.add_argument(
+        "--roles",
+        dest="roles",
+        type=argument_type(parse_roles),
+        help="Only extract turns with these comma-separated roles, e.g. assistant",
+    )
+    parser.add_argument(
+        "--knots",
+        action="store_true",
+        help="Group consecutive turns into topic knots, each with a hub note linking its turns",
+    )
     parser.add_argument("--force", action="store_true", help="Overwrite non-empty directory")
     parser.add_argument("--dry-run", action="store_true", help="Show plan without writing")
     parser.add_argument(
@@ -70,13 +372,94 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="When parsing HTML, derive title from page <title>",
     )
+    parser.add_argument(
+        "--prescan",
+        action="store_true",
+        help="Memory-map the page and parse only the region containing messages",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        type=argument_type(profile_name),
+        default=DEFAULT_PROFILE,
+        help="Registered extractor profile describing the page layout, e.g. chatgpt or chatgpt-legacy",
+    )
+    parser.add_argument(
+        "--profile-file",
+        dest="profile_file",
+        type=argument_type(profile_file),
+        help="JSON file with a custom extractor profile; overrides --profile",
+    )
+    parser.add_argument(
+        "--content-format",
+        dest="content_format",
+        choices=CONTENT_FORMATS,
+        default="text",
+        help="Turn body conversion: plain text, or Markdown with code fences, tables, headings and inline links",
+    )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=positive_int,
+        default=1,
+        help="Extract turn text in this many worker processes",
+    )
+    parser.add_argument(
+        "--max-input-bytes",
+        dest="max_input_bytes",
+        type=positive_int,
+        help="Refuse pages larger than this many bytes",
+    )
+    parser.add_argument(
+        "--max-nodes",
+        dest="max_nodes",
+        type=positive_int,
+        help="Stop parsing after this many HTML elements",
+    )
+    parser.add_argument(
+        "--max-depth",
+        dest="max_depth",
+        type=positive_int,
+        help="Stop parsing when elements nest deeper than this",
+    )
+    parser.add_argument(
+        "--max-turn-chars",
+        dest="max_turn_chars",
+        type=positive_int,
+        help="Stop when a single turn's text exceeds this many characters",
+    )
+    parser.add_argument(
+        "--time-budget",
+        dest="time_budget",
+        type=positive_float,
+        help="Stop when parsing a page takes longer than this many seconds",
+    )
+    parser.add_argument(
+        "--layout-cache",
+        dest="layout_cache",
+        help="JSON file of known page layouts; pages with a known layout skip the full message search",
+    )
+    parser.add_argument(
+        "--catalog",
+        dest="catalog",
+        help="SQLite catalog of converted inputs; already converted pages are skipped",
+    )
+    parser.add_argument(
+        "--index-note",
+        dest="index_note",
+        default="Conversations.md",
+        help="Vault-level index note maintained alongside --catalog",
+    )
     return parser
 
 
 def main() -> None:
     parser = build_parser()
     args = parser.parse_args()
-    build_command(args)
+    try:
+        build_command(args)
+    except ResourceLimitExceeded as exc:
+        raise SystemExit(f"Stopped: {exc}. Raise the limit to convert this page.")
 
 
 if __name__ == "__main__":
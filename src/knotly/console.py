@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import sys
+from typing import Optional, TextIO
+
 
 class Console:
     """Minimal console compatible with the subset of Rich we use."""
 
+    def __init__(self, stream: Optional[TextIO] = None):
+        # stderr when stdout carries exported data; otherwise whatever sys.stdout is at print time.
+        self.stream = stream
+
     def log(self, message: str) -> None:
-        print(f"[knotly] {message}")
+        print(f"[knotly] {message}", file=self.stream or sys.stdout)
 
     def print(self, message: str) -> None:
-        print(message)
+        print(message, file=self.stream or sys.stdout)
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import math
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List
+
+from .models import Turn
+from .utils import words_from_markdown
+
+# Hashed term space; a segment centroid never holds more than this many entries.
+VECTOR_DIMENSIONS = 1 << 12
+# An exchange whose cosine similarity to the current knot falls below this starts a new knot...
+DEFAULT_THRESHOLD = 0.1
+# ...as does one whose similarity drops below this fraction of the knot's running mean similarity.
+DEFAULT_RELATIVE_DROP = 0.6
+# Knots are never split before they hold this many turns.
+DEFAULT_MIN_TURNS = 4
+
+STOPWORDS = frozenset(
+    """
+    a about above after again all also am an and any are as at be because been before being below
+    between both but by can could did do does doing down during each few for from further had has
+    have having he her here hers him his how i if in into is it its itself just let me more most my
+    no nor not now of off on once only or other our ours out over own same she should so some such
+    than that the their theirs them then there these they this those through to too under until up
+    very was we were what when where which while who whom why will with would you your yours
+    """.split()
+)
+
+Vector = Dict[int, float]
+
+
+@dataclass
+class Knot:
+    """A run of consecutive turns about one topic."""
+
+    index: int
+    turns: List[Turn] = field(default_factory=list)
+
+    @property
+    def first_turn(self) -> int:
+        return self.turns[0].turn_index
+
+    @property
+    def last_turn(self) -> int:
+        return self.turns[-1].turn_index
+
+
+def term_vector(texts: Iterable[str]) -> Vector:
+    """Unit-length, sublinear tf vector over hashed terms (stable across processes)."""
+    counts: Dict[int, int] = {}
+    for text in texts:
+        for word in words_from_markdown(text):
+            word = word.lower()
+            if len(word) < 3 or word in STOPWORDS or word.isdigit():
+                continue
+            bucket = zlib.crc32(word.encode("utf-8")) % VECTOR_DIMENSIONS
+            counts[bucket] = counts.get(bucket, 0) + 1
+    vector = {bucket: 1.0 + math.log(count) for bucket, count in counts.items()}
+    norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+    if norm:
+        for bucket in vector:
+            vector[bucket] /= norm
+    return vector
+
+
+def iter_exchanges(turns: Iterable[Turn]) -> Iterator[List[Turn]]:
+    """Group turns into exchanges: a user turn plus the replies that follow it."""
+    exchange: List[Turn] = []
+    for turn in turns:
+        if turn.role == "user" and exchange:
+            yield exchange
+            exchange = []
+        exchange.append(turn)
+    if exchange:
+        yield exchange
+
+
+def segment_turns(
+    turns: Iterable[Turn],
+    *,
+    threshold: float = DEFAULT_THRESHOLD,
+    relative_drop: float = DEFAULT_RELATIVE_DROP,
+    min_turns: int = DEFAULT_MIN_TURNS,
+) -> List[Knot]:
+    """Split a conversation into knots in one online pass.
+
+    Each exchange is compared with the running centroid of the current knot. A
+    similarity below ``threshold``, or well below the knot's mean so far, marks a
+    change point, so boundaries always fall on user turns. Work is linear in the
+    text, and the only state is one sparse centroid and a running mean.
+    """
+    knots: List[Knot] = []
+    centroid: Vector = {}
+    squared_norm = 0.0
+    similarity_sum = 0.0
+    compared = 0
+    for exchange in iter_exchanges(turns):
+        vector = term_vector(turn.content for turn in exchange)
+        current = knots[-1] if knots else None
+        if current is not None and vector and squared_norm:
+            similarity = sum(weight * centroid.get(bucket, 0.0) for bucket, weight in vector.items())
+            similarity /= math.sqrt(squared_norm)
+            if len(current.turns) >= min_turns and (
+                similarity < threshold or (compared and similarity < relative_drop * similarity_sum / compared)
+            ):
+                current = None
+            else:
+                similarity_sum += similarity
+                compared += 1
+        if current is None:
+            current = Knot(index=len(knots) + 1)
+            knots.append(current)
+            centroid = {}
+            squared_norm = 0.0
+            similarity_sum = 0.0
+            compared = 0
+        current.turns.extend(exchange)
+        for bucket, weight in vector.items():
+            old = centroid.get(bucket, 0.0)
+            centroid[bucket] = old + weight
+            squared_norm += weight * (2 * old + weight)
+    return knots
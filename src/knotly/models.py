@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from dataclasses import dataclass, field
+import sys
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
+# Models are slotted: a batch can hold tens of thousands of turns in memory, and
+# a per-instance __dict__ costs more than the fields themselves.
 
-@dataclass
+
+@dataclass(frozen=True, slots=True)
 class Link:
     text: str
     href: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Turn:
     turn_index: int
     turn_id: Optional[str]
@@ -21,11 +25,21 @@ class Turn:
     raw_content: Optional[str]
     created_at: Optional[datetime]
     data_turn: Optional[str] = None
-    links: List[Link] = field(default_factory=list)
+    links: Sequence[Link] = ()
     mnemonic: str = ""
 
+    def __post_init__(self) -> None:
+        # The same few role and author strings repeat on every turn; keep one copy of each.
+        self.role = sys.intern(self.role)
+        if self.author is not None:
+            self.author = sys.intern(self.author)
+        if self.data_turn is not None:
+            self.data_turn = sys.intern(self.data_turn)
+        # Links never change after extraction; a tuple has no spare list capacity.
+        self.links = tuple(self.links)
+
 
-@dataclass
+@dataclass(slots=True)
 class Conversation:
     title: str
     model: Optional[str]
@@ -1,3 +1,31 @@
-from .html_input import parse_html_export
+from .html_input import CONTENT_FORMATS, collect_participants, parse_html_export, stream_html_export
+from .json_export import active_branch, conversation_from_export, iter_export_conversations
+from .layouts import LayoutTable, layout_fingerprint
+from .limits import ResourceGuard, ResourceLimitExceeded, ResourceLimits, ResourceUsage
+from .profiles import DEFAULT_PROFILE, PROFILES, ExtractorProfile, get_profile, load_profile, register_profile
+from .selection import TurnSelection, parse_roles, parse_turn_ranges
 
-__all__ = ["parse_html_export"]
+__all__ = [
+    "CONTENT_FORMATS",
+    "DEFAULT_PROFILE",
+    "PROFILES",
+    "ExtractorProfile",
+    "LayoutTable",
+    "ResourceGuard",
+    "ResourceLimitExceeded",
+    "ResourceLimits",
+    "ResourceUsage",
+    "TurnSelection",
+    "active_branch",
+    "collect_participants",
+    "conversation_from_export",
+    "get_profile",
+    "iter_export_conversations",
+    "layout_fingerprint",
+    "load_profile",
+    "parse_html_export",
+    "parse_roles",
+    "parse_turn_ranges",
+    "register_profile",
+    "stream_html_export",
+]
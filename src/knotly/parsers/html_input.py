@@ -1,21 +1,45 @@
 from __future__ import annotations
 
+import re
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from html.parser import HTMLParser
+from itertools import repeat
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from ..models import Conversation, Link, Turn
-from ..utils import ensure_timezone, mnemonic_from_content, parse_datetime
+from ..utils import MnemonicRegistry, ensure_timezone, mnemonic_from_content, parse_datetime
+from .layouts import Layout, LayoutTable, fingerprint_markers, layout_fingerprint, selectors_with_markers
+from .limits import ResourceGuard
+from .markdown import html_to_markdown
+from .prescan import feed_prescanned
+from .profiles import DEFAULT_PROFILE, CompiledProfile, ExtractorProfile, compile_selector, get_profile
+from .selection import TurnSelection
+from .traversal import fold_contents, iter_find, iter_text, walk
 
 
-@dataclass
+# How turn bodies are converted: flattened plain text, or Markdown with inline markup.
+CONTENT_FORMATS = ("text", "markdown")
+
+WHITESPACE_RUN_RE = re.compile(r"[ \t\n\r\f]+")
+# Elements without content. The tree builder leaves them open (they own what follows),
+# so they are left out of the nesting depth reported to the resource guard.
+VOID_ELEMENTS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+)
+
+
+@dataclass(eq=False, repr=False)
 class Node:
     tag: str
     attrs: Dict[str, str]
     parent: Optional["Node"] = None
     children: List["Node"] = field(default_factory=list)
     _contents: List[object] = field(default_factory=list)
+    # Character offsets of the start tag and of the tag that closed the node in the fed source.
+    source_start: Optional[int] = None
+    source_end: Optional[int] = None
 
     def add_child(self, child: "Node") -> None:
         self.children.append(child)
@@ -25,31 +49,20 @@ class Node:
         if text:
             self._contents.append(text)
 
+    def __repr__(self) -> str:
+        return f"Node(tag={self.tag!r}, attrs={self.attrs!r}, children={len(self.children)})"
+
     def iter_text(self) -> List[str]:
-        pieces: List[str] = []
-        for item in self._contents:
-            if isinstance(item, str):
-                pieces.append(item)
-            elif isinstance(item, Node):
-                pieces.extend(item.iter_text())
-        return pieces
+        return list(iter_text(self))
+
+    def iter_find(self, predicate) -> Iterator["Node"]:
+        return iter_find(self, predicate)
 
     def find_all(self, predicate) -> List["Node"]:
-        matches = []
-        if predicate(self):
-            matches.append(self)
-        for child in self.children:
-            matches.extend(child.find_all(predicate))
-        return matches
+        return list(iter_find(self, predicate))
 
     def find_first(self, predicate) -> Optional["Node"]:
-        if predicate(self):
-            return self
-        for child in self.children:
-            found = child.find_first(predicate)
-            if found:
-                return found
-        return None
+        return next(iter_find(self, predicate), None)
 
     def get_attribute(self, name: str) -> Optional[str]:
         return self.attrs.get(name)
@@ -72,87 +85,325 @@ class Node:
 
 
 class SoupParser(HTMLParser):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        track_source: bool = False,
+        guard: Optional[ResourceGuard] = None,
+        collapse_whitespace: bool = False,
+    ) -> None:
         super().__init__(convert_charrefs=True)
         self.root = Node(tag="document", attrs={})
         self.stack = [self.root]
+        self.track_source = track_source
+        self.guard = guard
+        # Keep whitespace as a browser renders it (collapsed, verbatim inside <pre>)
+        # instead of dropping whitespace-only text.
+        self.collapse_whitespace = collapse_whitespace
+        self._preformatted = 0
+        self._open_voids = 0
+        self._chunks: List[str] = []
+        self._line_starts = [0]
+        self._fed = 0
+
+    def feed(self, data: str) -> None:
+        if self.track_source:
+            self._chunks.append(data)
+            newline = data.find("\n")
+            while newline >= 0:
+                self._line_starts.append(self._fed + newline + 1)
+                newline = data.find("\n", newline + 1)
+            self._fed += len(data)
+        super().feed(data)
+
+    @property
+    def source(self) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def source_offset(self) -> int:
+        lineno, column = self.getpos()
+        return self._line_starts[lineno - 1] + column
 
     def handle_starttag(self, tag: str, attrs: List[tuple]) -> None:
+        if self.guard is not None:
+            self.guard.enter_node(len(self.stack) - self._open_voids)
         attr_dict = {name: value for name, value in attrs}
         node = Node(tag=tag, attrs=attr_dict, parent=self.stack[-1])
+        if self.track_source:
+            node.source_start = self.source_offset()
         self.stack[-1].add_child(node)
         self.stack.append(node)
+        if tag == "pre":
+            self._preformatted += 1
+        elif tag in VOID_ELEMENTS:
+            self._open_voids += 1
 
     def handle_endtag(self, tag: str) -> None:
+        end = self.source_offset() if self.track_source else None
         while len(self.stack) > 1:
             node = self.stack.pop()
+            node.source_end = end
+            if node.tag == "pre":
+                self._preformatted -= 1
+            elif node.tag in VOID_ELEMENTS:
+                self._open_voids -= 1
             if node.tag == tag:
                 break
 
     def handle_data(self, data: str) -> None:
-        if data.strip():
+        if not self.collapse_whitespace:
+            if data.strip():
+                self.stack[-1].add_text(data)
+        elif self._preformatted:
             self.stack[-1].add_text(data)
+        else:
+            self.stack[-1].add_text(WHITESPACE_RUN_RE.sub(" ", data))
+
+
+def parse_html_export(
+    path: Path,
+    *,
+    timezone: Optional[str] = None,
+    title: Optional[str] = None,
+    by_title: bool = False,
+    prescan: bool = False,
+    profile: Union[str, ExtractorProfile] = DEFAULT_PROFILE,
+    workers: int = 1,
+    selection: Optional[TurnSelection] = None,
+    guard: Optional[ResourceGuard] = None,
+    content_format: str = "text",
+    layouts: Optional[LayoutTable] = None,
+) -> Conversation:
+    conversation, turns = stream_html_export(
+        path,
+        timezone=timezone,
+        title=title,
+        by_title=by_title,
+        prescan=prescan,
+        profile=profile,
+        workers=workers,
+        selection=selection,
+        guard=guard,
+        content_format=content_format,
+        layouts=layouts,
+    )
+    conversation.turns = list(turns)
+    conversation.participants = collect_participants(conversation.turns)
+    return conversation
+
+
+def collect_participants(turns: Iterable[Turn]) -> List[str]:
+    return list(dict.fromkeys(turn.author for turn in turns if turn.author))
+
+
+def stream_html_export(
+    path: Path,
+    *,
+    timezone: Optional[str] = None,
+    title: Optional[str] = None,
+    by_title: bool = False,
+    prescan: bool = False,
+    profile: Union[str, ExtractorProfile] = DEFAULT_PROFILE,
+    workers: int = 1,
+    selection: Optional[TurnSelection] = None,
+    guard: Optional[ResourceGuard] = None,
+    content_format: str = "text",
+    layouts: Optional[LayoutTable] = None,
+) -> Tuple[Conversation, Iterator[Turn]]:
+    """Return the conversation header and an iterator that extracts turns lazily.
+
+    With ``workers > 1`` turn bodies are re-parsed from their source slices and
+    converted to text in a process pool; the result is identical to the serial path.
+    ``selection`` is applied right after message discovery, so text and links are
+    only collected for the selected turns. ``guard`` counts and bounds the input
+    size, element count, nesting depth, per-turn text and elapsed time. With
+    ``content_format="markdown"`` turn bodies keep headings, emphasis, code fences,
+    tables and inline links, and links are collected in the same traversal.
+    ``layouts`` lets pages whose layout fingerprint is known skip straight to the
+    strategy that worked for it before.
+    """
+    if content_format not in CONTENT_FORMATS:
+        raise ValueError(f"Unknown content format {content_format!r}")
+    compiled = get_profile(profile)
+    if guard is not None:
+        guard.check_input(path.stat().st_size)
+    fingerprint = layout_fingerprint(path, compiled.profile) if layouts is not None else None
+    parser = SoupParser(
+        track_source=workers > 1, guard=guard, collapse_whitespace=content_format == "markdown"
+    )
+    if prescan and feed_prescanned(parser, path):
+        # The region ends mid-document, so flush any text still held back by the parser.
+        parser.close()
+    else:
+        parser.feed(path.read_text(encoding="utf-8"))
 
-
-def parse_html_export(path: Path, *, timezone: Optional[str] = None, title: Optional[str] = None, by_title: bool = False) -> Conversation:
-    parser = SoupParser()
-    parser.feed(path.read_text(encoding="utf-8"))
+    scan, message_nodes = discover_messages(parser.root, compiled, layouts, fingerprint)
+    if guard is not None:
+        guard.check_time()
 
     conversation_title = title
     if not conversation_title and by_title:
-        title_node = parser.root.find_first(lambda node: node.tag == "title")
-        if title_node:
-            conversation_title = "".join(title_node.iter_text()).strip()
+        if scan.title:
+            conversation_title = "".join(scan.title.iter_text()).strip()
     conversation_title = conversation_title or "Conversation"
 
-    participants: List[str] = []
-    turns: List[Turn] = []
-
-    def is_message(node: Node) -> bool:
-        if node.tag.lower() not in {"div", "article", "section"}:
-            return False
-        attrs = node.attrs
-        if any(key.startswith("data-") for key in attrs):
-            if (
-                attrs.get("data-message-id")
-                or attrs.get("data-role")
-                or attrs.get("data-author-role")
-                or attrs.get("data-message-author-role")
-                or attrs.get("data-turn")
-            ):
-                return True
-        class_attr = attrs.get("class", "")
-        return "conversation-turn" in class_attr.split()
-
-    message_nodes_all = parser.root.find_all(is_message)
-
-    message_nodes = [
-        node
-        for node in message_nodes_all
-        if node.find_attribute(["data-message-id", "data-message-author-role", "data-role", "data-author-role"])
+    conversation = Conversation(
+        title=conversation_title,
+        model=None,
+        conversation_id=None,
+        exported_at=None,
+        participants=[],
+        turns=[],
+    )
+    messages = [
+        (idx, node, message_role(node, compiled.profile, idx))
+        for idx, node in enumerate(message_nodes, start=1)
     ]
+    if selection:
+        messages = [message for message in messages if selection.includes(message[0], message[2])]
+    content_nodes = [scan.content_of(node) for _, node, _ in messages]
+    if workers > 1:
+        contents = _extract_parallel(
+            content_nodes, parser.source, compiled.profile.link, workers, content_format
+        )
+    elif content_format == "markdown":
+        contents = _extract_markdown(content_nodes, compiled.profile.link)
+    else:
+        contents = _extract_serial(content_nodes, scan)
+    return conversation, _iter_turns(messages, contents, compiled.profile, timezone, guard)
 
-    if not message_nodes:
-        message_nodes = message_nodes_all
-
-    def node_priority(node: Node) -> int:
-        attrs = node.attrs
-        if attrs.get("data-message-author-role"):
-            return 4
-        if attrs.get("data-message-id"):
-            return 3
-        if attrs.get("data-role") or attrs.get("data-author-role"):
-            return 2
-        if attrs.get("data-turn"):
-            return 1
-        return 0
+
+@dataclass
+class ScanResult:
+    title: Optional[Node] = None
+    candidates: List[Node] = field(default_factory=list)
+    fallback: List[Node] = field(default_factory=list)
+    # Keyed by id() of message candidates and content nodes.
+    content: Dict[int, Node] = field(default_factory=dict)
+    links: Dict[int, List[Node]] = field(default_factory=dict)
+
+    def content_of(self, node: Node) -> Node:
+        return self.content.get(id(node), node)
+
+    def links_of(self, node: Node) -> List[Node]:
+        return self.links.get(id(node), [])
+
+
+def scan_tree(root: Node, compiled: CompiledProfile) -> ScanResult:
+    """Evaluate every profile selector in one preorder traversal of ``root``."""
+    classify = compiled.selectors.classify
+    message_flag = compiled.message_flag
+    fallback_flag = compiled.fallback_flag
+    content_flag = compiled.content_flag
+    link_flag = compiled.link_flag
+    title_flag = compiled.title_flag
+    candidate_flags = message_flag | fallback_flag
+
+    result = ScanResult()
+    # Open message candidates and content nodes enclosing the current node.
+    scopes: List[Tuple[Node, bool]] = []
+
+    def enter(node: Node) -> None:
+        mask = classify(node.tag, node.attrs)
+        if not mask:
+            return
+        if mask & title_flag and result.title is None:
+            result.title = node
+        if mask & content_flag:
+            for scope, is_candidate in scopes:
+                if is_candidate:
+                    result.content.setdefault(id(scope), node)
+        if mask & message_flag:
+            result.candidates.append(node)
+        if mask & fallback_flag:
+            result.fallback.append(node)
+        if mask & (candidate_flags | content_flag):
+            scopes.append((node, bool(mask & candidate_flags)))
+            result.links[id(node)] = []
+        if mask & link_flag:
+            for scope, _ in scopes:
+                result.links[id(scope)].append(node)
+
+    def leave(node: Node) -> None:
+        if scopes and scopes[-1][0] is node:
+            scopes.pop()
+
+    walk(root, enter, leave)
+    return result
+
+
+def discover_messages(
+    root: Node,
+    compiled: CompiledProfile,
+    layouts: Optional[LayoutTable] = None,
+    fingerprint: Optional[str] = None,
+) -> Tuple[ScanResult, List[Node]]:
+    """Scan for messages, using the known strategy for ``fingerprint`` when there is one."""
+    if layouts is not None and fingerprint is not None:
+        narrowed = layouts.strategy(fingerprint, compiled.profile)
+        if narrowed is not None:
+            scan = scan_tree(root, narrowed)
+            message_nodes = select_messages(scan, narrowed)
+            if message_nodes:
+                layouts.hit(fingerprint)
+                return scan, message_nodes
+            # The layout changed under a familiar fingerprint; relearn it below.
+            layouts.forget(fingerprint)
+
+    scan = scan_tree(root, compiled)
+    message_nodes = select_messages(scan, compiled)
+    if layouts is not None and fingerprint is not None and message_nodes:
+        layout = learn_layout(scan, message_nodes, compiled, fingerprint)
+        if layout is not None:
+            layouts.learn(fingerprint, layout)
+    return scan, message_nodes
+
+
+def learn_layout(
+    scan: ScanResult, message_nodes: List[Node], compiled: CompiledProfile, fingerprint: str
+) -> Optional[Layout]:
+    """Find the narrowest strategy ``fingerprint`` justifies that reproduces ``message_nodes``.
+
+    Selectors are dropped only when the fingerprint shows their markers are absent,
+    never because they happened not to match this page.
+    """
+    if not scan.candidates:
+        return Layout(message="")
+    message = selectors_with_markers(compiled.profile.message, fingerprint_markers(fingerprint))
+    if not message:
+        return None
+    matches = compile_selector(message)
+    candidates = [node for node in scan.candidates if matches(node.tag, node.attrs)]
+    layout = Layout(message=message)
+    narrowed = get_profile(layout.narrow(compiled.profile))
+    if _same_nodes(select_messages(ScanResult(candidates=candidates), narrowed), message_nodes):
+        return layout
+    return None
+
+
+def _same_nodes(left: List[Node], right: List[Node]) -> bool:
+    return len(left) == len(right) and all(a is b for a, b in zip(left, right))
+
+
+def select_messages(scan: ScanResult, compiled: CompiledProfile) -> List[Node]:
+    profile = compiled.profile
+    message_nodes = scan.candidates
+    if compiled.is_preferred:
+        preferred = [node for node in message_nodes if compiled.is_preferred(node.tag, node.attrs)]
+        if preferred:
+            message_nodes = preferred
+    if not profile.key_attributes:
+        # Every candidate is its own message; there is nothing to deduplicate.
+        return message_nodes or scan.fallback
 
     keyed_nodes: Dict[str, tuple[int, int, Node]] = {}
     for idx, node in enumerate(message_nodes):
-        key = node.find_attribute_in_ancestors(["data-message-id", "data-turn-id", "id"])
+        key = node.find_attribute_in_ancestors(profile.key_attributes)
         if not key:
             key = f"__index_{idx}"
-        priority = node_priority(node)
+        priority = compiled.priority(node.tag, node.attrs)
         existing = keyed_nodes.get(key)
         if not existing or priority > existing[0]:
             keyed_nodes[key] = (priority, idx, node)
@@ -160,66 +411,105 @@ def parse_html_export(path: Path, *, timezone: Optional[str] = None, title: Opti
     message_nodes = [entry[2] for entry in sorted(keyed_nodes.values(), key=lambda item: item[1])]
 
     if not message_nodes:
-        def is_text_base(node: Node) -> bool:
-            return node.tag.lower() == "div" and "text-base" in node.attrs.get("class", "").split()
-        message_nodes = parser.root.find_all(is_text_base)
-
-    for idx, node in enumerate(message_nodes, start=1):
-        role = node.find_attribute_in_ancestors(
-            ["data-role", "data-author-role", "data-message-author-role"]
-        )
-        if not role:
-            role = node.attrs.get("class", "unknown").split()[0] if node.attrs.get("class") else "unknown"
-        author = node.get_attribute("data-author-name")
+        message_nodes = scan.fallback
+    return message_nodes
+
+
+def message_role(node: Node, profile: ExtractorProfile, turn_index: int = 1) -> str:
+    role = node.find_attribute_in_ancestors(profile.role_attributes)
+    if not role and profile.role_cycle:
+        role = profile.role_cycle[(turn_index - 1) % len(profile.role_cycle)]
+    if not role:
+        role = node.attrs.get("class", "unknown").split()[0] if node.attrs.get("class") else "unknown"
+    return role or "unknown"
+
+
+def _iter_turns(
+    messages: List[Tuple[int, Node, str]],
+    contents: Iterator[Tuple[str, List[Link]]],
+    profile: ExtractorProfile,
+    timezone: Optional[str],
+    guard: Optional[ResourceGuard] = None,
+) -> Iterator[Turn]:
+    mnemonics = MnemonicRegistry()
+    for (idx, node, role), (content, links) in zip(messages, contents):
+        if guard is not None:
+            guard.check_turn(len(content))
+        author = node.get_attribute(profile.author_attribute) if profile.author_attribute else None
         if not author and role:
             author = role.title()
 
-        time_text = node.find_attribute_in_ancestors(["data-timestamp", "data-created"])
+        time_text = node.find_attribute_in_ancestors(profile.timestamp_attributes)
         created_at = ensure_timezone(parse_datetime(time_text), timezone)
 
-        content_node = node.find_first(lambda n: n is not node and n.tag.lower() == "div" and "message-content" in n.attrs.get("class", "").split())
-        if not content_node:
-            content_node = node
-        content = _collect_text(content_node).strip()
+        mnemonic = mnemonics.claim(mnemonic_from_content(content))
+        turn_id = node.find_attribute_in_ancestors(profile.turn_id_attributes)
+
+        yield Turn(
+            turn_index=idx,
+            turn_id=turn_id,
+            role=role,
+            author=author,
+            content=content,
+            raw_content=None,
+            created_at=created_at,
+            data_turn=node.find_attribute_in_ancestors(profile.data_turn_attributes),
+            links=links,
+            mnemonic=mnemonic,
+        )
 
+
+def _extract_serial(content_nodes: List[Node], scan: ScanResult) -> Iterator[Tuple[str, List[Link]]]:
+    for content_node in content_nodes:
+        content = _collect_text(content_node).strip()
         links = []
-        link_nodes = content_node.find_all(lambda n: n.tag.lower() == "a" and n.get_attribute("href"))
-        for link in link_nodes:
+        for link in scan.links_of(content_node):
             links.append(Link(text=_collect_text(link).strip(), href=link.get_attribute("href") or ""))
+        yield content, links
 
-        mnemonic = mnemonic_from_content(content)
-        turn_id = node.find_attribute_in_ancestors(
-            ["data-message-id", "id", "data-turn-id"]
-        )
 
-        if author:
-            participants.append(author)
-
-        turns.append(
-            Turn(
-                turn_index=idx,
-                turn_id=turn_id,
-                role=role or "unknown",
-                author=author,
-                content=content,
-                raw_content=None,
-                created_at=created_at,
-                data_turn=node.find_attribute_in_ancestors(["data-turn"]),
-                links=links,
-                mnemonic=mnemonic,
-            )
-        )
+def _extract_markdown(content_nodes: List[Node], link_selector: str) -> Iterator[Tuple[str, List[Link]]]:
+    is_link = compile_selector(link_selector)
+    for content_node in content_nodes:
+        yield html_to_markdown(content_node, is_link)
 
-    participants = list(dict.fromkeys([p for p in participants if p]))
 
-    return Conversation(
-        title=conversation_title,
-        model=None,
-        conversation_id=None,
-        exported_at=None,
-        participants=participants,
-        turns=turns,
-    )
+def _extract_parallel(
+    content_nodes: List[Node], source: str, link_selector: str, workers: int, content_format: str = "text"
+) -> Iterator[Tuple[str, List[Link]]]:
+    fragments = [
+        source[node.source_start : len(source) if node.source_end is None else node.source_end]
+        for node in content_nodes
+    ]
+    if not fragments:
+        return
+    chunksize = max(1, len(fragments) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _extract_fragment, fragments, repeat(link_selector), repeat(content_format), chunksize=chunksize
+        )
+        for content, links in results:
+            yield content, [Link(text=text, href=href) for text, href in links]
+
+
+def _extract_fragment(
+    fragment: str, link_selector: str, content_format: str = "text"
+) -> Tuple[str, List[Tuple[str, str]]]:
+    markdown = content_format == "markdown"
+    parser = SoupParser(collapse_whitespace=markdown)
+    parser.feed(fragment)
+    parser.close()
+    # Content after an unmatched end tag lands beside the node, exactly as in the full parse.
+    node = parser.root.children[0]
+    is_link = compile_selector(link_selector)
+    if markdown:
+        content, found = html_to_markdown(node, is_link)
+        return content, [(link.text, link.href) for link in found]
+    links = [
+        (_collect_text(link).strip(), link.get_attribute("href") or "")
+        for link in node.find_all(lambda n: is_link(n.tag, n.attrs))
+    ]
+    return _collect_text(node).strip(), links
 
 
 BLOCK_ELEMENTS = {
@@ -274,99 +564,83 @@ DOUBLE_BREAK_ELEMENTS = {
 
 
 def _collect_text(node: Node) -> str:
-    def append_newlines(target: List[str], count: int) -> None:
-        if count <= 0:
-            return
-        existing = 0
-        idx = len(target) - 1
-        while idx >= 0:
-            segment = target[idx]
-            if segment and set(segment) == {"\n"}:
-                existing += len(segment)
-                idx -= 1
-                continue
-            break
-        needed = max(0, count - existing)
-        if needed:
-            target.append("\n" * needed)
-
-    def render(current: Node) -> str:
-        pieces: List[str] = []
-        for item in current._contents:
-            if isinstance(item, str):
-                pieces.append(item)
-                continue
-
-            tag = item.tag.lower()
-            rendered_child = render(item)
-
-            if tag in LINE_BREAK_ELEMENTS:
-                append_newlines(pieces, 1)
-                if rendered_child:
-                    pieces.append(rendered_child)
-                continue
-
-            if tag == "li":
-                parent = item.parent
-                prefix = "- "
-                if parent and parent.tag.lower() == "ol":
-                    position = 0
-                    found = False
-                    for child in parent.children:
-                        if isinstance(child, Node) and child.tag.lower() == "li":
-                            position += 1
-                            if child is item:
-                                prefix = f"{position}. "
-                                found = True
-                                break
-                    if not found:
-                        prefix = "1. "
-                item_text = rendered_child.strip()
-                if item_text:
-                    append_newlines(pieces, 1)
-                    lines = item_text.splitlines()
-                    first_line = lines[0]
-                    pieces.append(prefix + first_line)
-                    if len(lines) > 1:
-                        indent = " " * max(len(prefix), 4)
-                        continuation_lines = []
-                        for line in lines[1:]:
-                            if line.strip():
-                                continuation_lines.append(indent + line)
-                            else:
-                                continuation_lines.append("")
-                        pieces.append("\n" + "\n".join(continuation_lines))
-                append_newlines(pieces, 1)
-                continue
-
-            if tag in BLOCK_ELEMENTS:
-                block_text = rendered_child.strip()
-                if block_text:
-                    newline_count = 2 if tag in DOUBLE_BREAK_ELEMENTS else 1
-                    append_newlines(pieces, newline_count)
-                    pieces.append(block_text)
-                    append_newlines(pieces, newline_count)
-                else:
-                    append_newlines(pieces, 1 if tag not in DOUBLE_BREAK_ELEMENTS else 2)
-                continue
+    text = fold_contents(node, _place_rendered)
+    # Collapse runs of more than two newlines while keeping intentional blank lines.
+    return NEWLINE_RUN_RE.sub("\n\n", text).strip()
 
-            pieces.append(rendered_child)
 
-        return "".join(pieces)
+NEWLINE_RUN_RE = re.compile(r"\n{3,}")
 
-    text = render(node)
 
-    # Collapse runs of more than two newlines while keeping intentional blank lines.
-    normalized_lines: List[str] = []
-    newline_run = 0
-    for char in text:
-        if char == "\n":
-            newline_run += 1
-            if newline_run <= 2:
-                normalized_lines.append(char)
+def _append_newlines(target: List[str], count: int) -> None:
+    if count <= 0:
+        return
+    existing = 0
+    idx = len(target) - 1
+    while idx >= 0:
+        segment = target[idx]
+        if segment and set(segment) == {"\n"}:
+            existing += len(segment)
+            idx -= 1
+            continue
+        break
+    needed = max(0, count - existing)
+    if needed:
+        target.append("\n" * needed)
+
+
+def _place_rendered(pieces: List[str], item: Node, rendered_child: str) -> None:
+    """Append a child's rendered text to its parent's pieces according to the child's tag."""
+    tag = item.tag.lower()
+
+    if tag in LINE_BREAK_ELEMENTS:
+        _append_newlines(pieces, 1)
+        if rendered_child:
+            pieces.append(rendered_child)
+        return
+
+    if tag == "li":
+        parent = item.parent
+        prefix = "- "
+        if parent and parent.tag.lower() == "ol":
+            position = 0
+            found = False
+            for child in parent.children:
+                if isinstance(child, Node) and child.tag.lower() == "li":
+                    position += 1
+                    if child is item:
+                        prefix = f"{position}. "
+                        found = True
+                        break
+            if not found:
+                prefix = "1. "
+        item_text = rendered_child.strip()
+        if item_text:
+            _append_newlines(pieces, 1)
+            lines = item_text.splitlines()
+            first_line = lines[0]
+            pieces.append(prefix + first_line)
+            if len(lines) > 1:
+                indent = " " * max(len(prefix), 4)
+                continuation_lines = []
+                for line in lines[1:]:
+                    if line.strip():
+                        continuation_lines.append(indent + line)
+                    else:
+                        continuation_lines.append("")
+                pieces.append("\n" + "\n".join(continuation_lines))
+        _append_newlines(pieces, 1)
+        return
+
+    if tag in BLOCK_ELEMENTS:
+        block_text = rendered_child.strip()
+        if block_text:
+            newline_count = 2 if tag in DOUBLE_BREAK_ELEMENTS else 1
+            _append_newlines(pieces, newline_count)
+            pieces.append(block_text)
+            _append_newlines(pieces, newline_count)
         else:
-            newline_run = 0
-            normalized_lines.append(char)
+            _append_newlines(pieces, 1 if tag not in DOUBLE_BREAK_ELEMENTS else 2)
+        return
 
-    normalized = "".join(normalized_lines)
-    return normalized.strip()
+    pieces.append(rendered_child)
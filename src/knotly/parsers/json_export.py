@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime, timezone as dt_timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from ..models import Conversation, Link, Turn
+from ..utils import MnemonicRegistry, ensure_timezone, mnemonic_from_content
+from .html_input import collect_participants
+from .limits import ResourceGuard
+from .selection import TurnSelection
+
+READ_CHUNK_SIZE = 1 << 16
+VISIBLE_ROLES = {"user", "assistant"}
+MARKDOWN_LINK_RE = re.compile(r"(?<!!)\[([^\]\n]+)\]\((https?://[^)\s]+)\)")
+
+
+def iter_export_conversations(path: Path) -> Iterator[Dict[str, Any]]:
+    """Yield the conversations of a ChatGPT ``conversations.json`` one at a time.
+
+    The top-level array is decoded element by element, so memory is bounded by the
+    largest single conversation rather than the size of the export.
+    """
+    with path.open("r", encoding="utf-8-sig") as handle:
+        yield from _iter_json_array(handle)
+
+
+def _iter_json_array(handle: TextIO) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    eof = False
+
+    def fill(minimum: int) -> bool:
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = handle.read(max(READ_CHUNK_SIZE, minimum))
+        if not chunk:
+            eof = True
+            return False
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        return True
+
+    def peek() -> str:
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill(0):
+                return ""
+
+    if peek() != "[":
+        raise ValueError("Expected a JSON array of conversations")
+    pos += 1
+    if peek() == "]":
+        return
+    while True:
+        peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Incomplete element: read at least as much again so retries stay linear overall.
+                if not fill(len(buffer) - pos):
+                    raise
+                continue
+            if end == len(buffer) and fill(0):
+                # A scalar may continue past the end of the buffer; decode it again in full.
+                continue
+            break
+        pos = end
+        yield value
+        separator = peek()
+        pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Unexpected {separator or 'end of file'!r} in conversation array")
+
+
+def active_branch(conversation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return the mapping nodes on the active branch, root first, in linear time."""
+    mapping: Dict[str, Dict[str, Any]] = conversation.get("mapping") or {}
+    node_id = conversation.get("current_node")
+    if node_id not in mapping:
+        # No recorded leaf: start from the root and follow the newest child.
+        node_id = next(
+            (key for key, node in mapping.items() if node.get("parent") not in mapping),
+            None,
+        )
+        seen = set()
+        while node_id in mapping and node_id not in seen:
+            seen.add(node_id)
+            children = [child for child in mapping[node_id].get("children") or [] if child in mapping]
+            if not children:
+                break
+            node_id = children[-1]
+
+    branch = []
+    seen = set()
+    while node_id in mapping and node_id not in seen:
+        seen.add(node_id)
+        node = mapping[node_id]
+        branch.append(node)
+        node_id = node.get("parent")
+    branch.reverse()
+    return branch
+
+
+def conversation_from_export(
+    raw: Dict[str, Any],
+    *,
+    timezone: Optional[str] = None,
+    selection: Optional[TurnSelection] = None,
+    guard: Optional[ResourceGuard] = None,
+) -> Conversation:
+    """Build a conversation from one export entry.
+
+    With a ``guard`` the mapping size and active branch length count as nodes and
+    depth, and each message's text against the turn length limit.
+    """
+    turns: List[Turn] = []
+    turn_index = 0
+    # Every visible turn claims its mnemonic, so selected turns keep their full-build names.
+    mnemonics = MnemonicRegistry()
+    model = raw.get("default_model_slug")
+    branch = active_branch(raw)
+    if guard is not None:
+        guard.enter_tree(len(raw.get("mapping") or {}), len(branch))
+    for node in branch:
+        message = node.get("message")
+        if not message or not _is_visible(message):
+            continue
+        content = _message_text(message.get("content") or {}).strip()
+        if not content:
+            continue
+        if guard is not None:
+            guard.check_turn(len(content))
+
+        turn_index += 1
+        author = message.get("author") or {}
+        role = author.get("role") or "unknown"
+        metadata = message.get("metadata") or {}
+        if role == "assistant" and metadata.get("model_slug"):
+            model = metadata["model_slug"]
+        mnemonic = mnemonics.claim(mnemonic_from_content(content))
+        if selection and not selection.includes(turn_index, role):
+            continue
+
+        turns.append(
+            Turn(
+                turn_index=turn_index,
+                turn_id=message.get("id") or node.get("id"),
+                role=role,
+                author=author.get("name") or role.title(),
+                content=content,
+                raw_content=None,
+                created_at=ensure_timezone(_timestamp(message.get("create_time")), timezone),
+                data_turn=role,
+                links=[Link(text=text, href=href) for text, href in MARKDOWN_LINK_RE.findall(content)],
+                mnemonic=mnemonic,
+            )
+        )
+
+    return Conversation(
+        title=(raw.get("title") or "").strip() or "Conversation",
+        model=model,
+        conversation_id=raw.get("conversation_id") or raw.get("id"),
+        exported_at=None,
+        participants=collect_participants(turns),
+        turns=turns,
+    )
+
+
+def _is_visible(message: Dict[str, Any]) -> bool:
+    author = message.get("author") or {}
+    if author.get("role") not in VISIBLE_ROLES:
+        return False
+    if message.get("recipient", "all") != "all":
+        return False
+    metadata = message.get("metadata") or {}
+    return not metadata.get("is_visually_hidden_from_conversation")
+
+
+def _message_text(content: Dict[str, Any]) -> str:
+    content_type = content.get("content_type")
+    if content_type == "code":
+        language = content.get("language") or ""
+        if language == "unknown":
+            language = ""
+        return f"```{language}\n{content.get('text', '')}\n```"
+    parts = content.get("parts")
+    if parts is not None:
+        return "\n\n".join(part for part in parts if isinstance(part, str) and part.strip())
+    return content.get("text") or content.get("result") or ""
+
+
+def _timestamp(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromtimestamp(float(value), tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
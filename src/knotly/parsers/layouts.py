@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .profiles import CompiledProfile, ExtractorProfile, compile_selector, get_profile, parse_selector
+from .prescan import BODY_MARKER
+
+# Markers are looked for in this many bytes from the first one found after <body>.
+FINGERPRINT_WINDOW = 1 << 16
+LAYOUT_TABLE_VERSION = 3
+
+
+@lru_cache(maxsize=None)
+def profile_markers(profile: ExtractorProfile) -> Tuple[bytes, ...]:
+    """Attribute names and class tokens the profile's message selectors depend on."""
+    markers = set()
+    for selector in (profile.message, profile.preferred, profile.fallback, profile.content):
+        for simple in parse_selector(selector):
+            markers.update(f"{name}=".encode() for name, _, _ in simple.attrs)
+            markers.update(cls.encode() for cls in simple.classes)
+    return tuple(sorted(markers))
+
+
+def layout_fingerprint(path: Path, profile: ExtractorProfile) -> str:
+    """Name the page layout after the profile markers present early in its message region.
+
+    Only a window of the memory-mapped file is searched, so this costs a few
+    ``find`` calls however large the page is.
+    """
+    markers = profile_markers(profile)
+    found: List[str] = []
+    with path.open("rb") as handle:
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            buffer = None
+        if buffer is not None:
+            with buffer:
+                body = max(buffer.find(BODY_MARKER), 0)
+                # Searches stop at the end of the earliest window seen so far.
+                limit = len(buffer)
+                positions = []
+                for marker in markers:
+                    position = buffer.find(marker, body, limit)
+                    positions.append(position)
+                    if position >= 0:
+                        limit = min(limit, position + FINGERPRINT_WINDOW)
+                hits = [position for position in positions if position >= 0]
+                if hits:
+                    end = min(hits) + FINGERPRINT_WINDOW
+                    found = [
+                        marker.decode()
+                        for marker, position in zip(markers, positions)
+                        if 0 <= position < end
+                    ]
+    return "|".join([profile_key(profile), *found])
+
+
+@lru_cache(maxsize=None)
+def profile_key(profile: ExtractorProfile) -> str:
+    """The profile name plus a digest of its definition, so edited profiles relearn layouts."""
+    return f"{profile.name}:{hashlib.sha256(repr(profile).encode('utf-8')).hexdigest()[:8]}"
+
+
+@dataclass
+class Layout:
+    """What a full-strategy parse needed for pages with one fingerprint."""
+
+    # Message selectors the fingerprint's markers allow; empty when the fallback was used.
+    message: str
+    hits: int = 0
+
+    def narrow(self, profile: ExtractorProfile) -> ExtractorProfile:
+        if not self.message:
+            return replace(profile, message="", preferred="", priorities=(), key_attributes=())
+        # The fingerprint cannot tell flat from nested markup, so duplicate resolution
+        # (preference, priority and keys) always stays.
+        return replace(profile, message=self.message, fallback="")
+
+
+class LayoutTable:
+    """Fingerprints of page layouts that extracted successfully, with their strategy.
+
+    Backed by a small JSON file when ``path`` is given; otherwise kept in memory.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = path
+        self.layouts: Dict[str, Layout] = {}
+        self.known = 0
+        self.learned = 0
+        self._compiled: Dict[str, CompiledProfile] = {}
+        self._dirty = False
+        if path is not None and path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == LAYOUT_TABLE_VERSION:
+                for fingerprint, entry in data.get("layouts", {}).items():
+                    self.layouts[fingerprint] = Layout(**entry)
+
+    def strategy(self, fingerprint: str, profile: ExtractorProfile) -> Optional[CompiledProfile]:
+        """The narrowed profile for a known layout, or ``None``."""
+        layout = self.layouts.get(fingerprint)
+        if layout is None:
+            return None
+        compiled = self._compiled.get(fingerprint)
+        if compiled is None:
+            compiled = self._compiled[fingerprint] = get_profile(layout.narrow(profile))
+        return compiled
+
+    def hit(self, fingerprint: str) -> None:
+        self.layouts[fingerprint].hits += 1
+        self.known += 1
+        self._dirty = True
+
+    def forget(self, fingerprint: str) -> None:
+        self.layouts.pop(fingerprint, None)
+        self._compiled.pop(fingerprint, None)
+        self._dirty = True
+
+    def learn(self, fingerprint: str, layout: Layout) -> None:
+        layout.hits = 1
+        self.layouts[fingerprint] = layout
+        self._compiled.pop(fingerprint, None)
+        self.learned += 1
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.path is None or not self._dirty:
+            return
+        data: Dict[str, Any] = {
+            "version": LAYOUT_TABLE_VERSION,
+            "layouts": {
+                fingerprint: {"message": layout.message, "hits": layout.hits}
+                for fingerprint, layout in sorted(self.layouts.items())
+            },
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+        self._dirty = False
+
+
+def fingerprint_markers(fingerprint: str) -> FrozenSet[str]:
+    """The markers a fingerprint records as present, without its profile key."""
+    return frozenset(fingerprint.split("|")[1:])
+
+
+def selectors_with_markers(selector: str, markers: FrozenSet[str]) -> str:
+    """The comma-separated parts of ``selector`` whose attributes and classes are all in ``markers``.
+
+    Tags are not part of the fingerprint, so every tag variant of a kept selector stays.
+    """
+    kept = []
+    for part in (part.strip() for part in selector.split(",")):
+        if not part:
+            continue
+        (simple,) = parse_selector(part)
+        needed = {f"{name}=" for name, _, _ in simple.attrs} | set(simple.classes)
+        if needed <= markers:
+            kept.append(part)
+    return ", ".join(kept)
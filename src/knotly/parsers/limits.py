@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+# The clock is read once per this many elements rather than on every start tag.
+CLOCK_INTERVAL = 1024
+
+
+class ResourceLimitExceeded(RuntimeError):
+    """A page exceeded one of the configured ``ResourceLimits``."""
+
+    def __init__(self, limit: str, value: float, maximum: float):
+        self.limit = limit
+        self.value = value
+        self.maximum = maximum
+        super().__init__(f"{limit} {value:g} exceeds the limit of {maximum:g}")
+
+    def __reduce__(self):
+        # Raised in worker processes too; rebuild from the fields, not the message.
+        return type(self), (self.limit, self.value, self.maximum)
+
+
+@dataclass(frozen=True)
+class ResourceLimits:
+    """Upper bounds for one parse; ``None`` leaves a resource unbounded."""
+
+    max_input_bytes: Optional[int] = None
+    max_nodes: Optional[int] = None
+    max_depth: Optional[int] = None
+    max_turn_chars: Optional[int] = None
+    time_budget: Optional[float] = None  # seconds of wall-clock time
+
+
+@dataclass
+class ResourceUsage:
+    input_bytes: int = 0
+    nodes: int = 0
+    max_depth: int = 0
+    max_turn_chars: int = 0
+    elapsed: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.input_bytes} bytes, {self.nodes} nodes, depth {self.max_depth}, "
+            f"largest turn {self.max_turn_chars} chars, {self.elapsed:.2f}s"
+        )
+
+    def as_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+class ResourceGuard:
+    """Count what a parse consumes and raise ``ResourceLimitExceeded`` past a limit.
+
+    Counters are kept even without limits so they can be reported to tune them.
+    """
+
+    def __init__(self, limits: Optional[ResourceLimits] = None):
+        self.limits = limits or ResourceLimits()
+        self.usage = ResourceUsage()
+        self.started = time.perf_counter()
+        # Per-element bounds as plain numbers so the hot path is two comparisons.
+        self._max_nodes = _bound(self.limits.max_nodes)
+        self._max_depth = _bound(self.limits.max_depth)
+
+    def check_input(self, size: int) -> None:
+        self.usage.input_bytes += size
+        self._check("input bytes", self.usage.input_bytes, self.limits.max_input_bytes)
+
+    def enter_node(self, depth: int) -> None:
+        usage = self.usage
+        nodes = usage.nodes = usage.nodes + 1
+        if depth > usage.max_depth:
+            usage.max_depth = depth
+            if depth > self._max_depth:
+                raise ResourceLimitExceeded("nesting depth", depth, self._max_depth)
+        if nodes > self._max_nodes:
+            raise ResourceLimitExceeded("node count", nodes, self._max_nodes)
+        if not nodes % CLOCK_INTERVAL:
+            self.check_time()
+
+    def enter_tree(self, nodes: int, depth: int) -> None:
+        """Count a whole tree of ``nodes`` elements, ``depth`` levels deep, at once."""
+        usage = self.usage
+        usage.nodes += nodes
+        if depth > usage.max_depth:
+            usage.max_depth = depth
+            if depth > self._max_depth:
+                raise ResourceLimitExceeded("nesting depth", depth, self._max_depth)
+        if usage.nodes > self._max_nodes:
+            raise ResourceLimitExceeded("node count", usage.nodes, self._max_nodes)
+        self.check_time()
+
+    def check_turn(self, chars: int) -> None:
+        if chars > self.usage.max_turn_chars:
+            self.usage.max_turn_chars = chars
+        self._check("turn length", chars, self.limits.max_turn_chars)
+        self.check_time()
+
+    def check_time(self) -> None:
+        self.usage.elapsed = time.perf_counter() - self.started
+        self._check("parse seconds", self.usage.elapsed, self.limits.time_budget)
+
+    @staticmethod
+    def _check(limit: str, value: float, maximum: Optional[float]) -> None:
+        if maximum is not None and value > maximum:
+            raise ResourceLimitExceeded(limit, value, maximum)
+
+
+def _bound(maximum: Optional[float]) -> float:
+    return math.inf if maximum is None else maximum
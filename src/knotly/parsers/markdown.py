@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..models import Link
+from .traversal import fold_contents, iter_find
+
+# Block boundaries are recorded as markers while folding and resolved into newlines
+# only where line structure matters, so preformatted text is never rewritten.
+LINE_BREAK = "\x01"
+PARAGRAPH_BREAK = "\x02"
+BREAK_RUN_RE = re.compile("[ \t]*[\x01\x02][\x01\x02 \t]*")
+CONTENT_RE = re.compile("[^ \t\n\x01\x02\x03]")
+# Literal text that would read as Markdown syntax is escaped. Block syntax only
+# matters at the start of a line, which is unknown until breaks are resolved, so
+# text that starts with it gets a marker where the backslash would go.
+LINE_START = "\x03"
+INLINE_SYNTAX_RE = re.compile(r"([*_`\[]|\\(?=[!-/:-@\[-`{-~]))")
+LINE_SYNTAX_RE = re.compile(r"[ \t]*(?:\d+(?=\.)|(?=[#>+-]))")
+LINE_START_RE = re.compile("^([ \t]*\\d*)\x03", re.MULTILINE)
+ESCAPED_RE = re.compile(r"\\([!-/:-@\[-`{-~])")
+LANGUAGE_RE = re.compile(r"(?:^|\s)(?:language|lang)-([\w+#.-]+)")
+
+PARAGRAPH_ELEMENTS = {
+    "address",
+    "article",
+    "aside",
+    "div",
+    "dl",
+    "fieldset",
+    "figure",
+    "footer",
+    "form",
+    "header",
+    "main",
+    "nav",
+    "p",
+    "section",
+}
+LINE_ELEMENTS = {"dd", "dt", "figcaption", "tbody", "tfoot", "thead"}
+HEADINGS = {"h1": 1, "h2": 2, "h3": 3, "h4": 4, "h5": 5, "h6": 6}
+EMPHASIS = {"strong": "**", "b": "**", "em": "*", "i": "*", "del": "~~", "s": "~~"}
+DROPPED_ELEMENTS = {"button", "script", "style", "svg", "template"}
+
+LinkPredicate = Callable[[str, Dict[str, Optional[str]]], bool]
+
+
+def html_to_markdown(node: Any, is_link: LinkPredicate) -> Tuple[str, List[Link]]:
+    """Convert ``node`` to Markdown and collect its links in the same traversal.
+
+    Expects a tree built with ``SoupParser(collapse_whitespace=True)``, whose text
+    outside ``<pre>`` is already collapsed the way a browser would render it.
+    """
+    converter = _MarkdownConverter(is_link)
+    rendered = fold_contents(node, converter.place, _escape_text, _keeps_text)
+    return resolve_breaks(rendered), converter.links
+
+
+def resolve_breaks(text: str) -> str:
+    """Turn break markers into newlines, dropping the spaces around them.
+
+    Line-start markers become backslashes where they begin a line and are dropped
+    elsewhere.
+    """
+
+    def replace(match: "re.Match[str]") -> str:
+        if match.start() == 0 or match.end() == len(text):
+            return ""
+        return "\n\n" if PARAGRAPH_BREAK in match.group() else "\n"
+
+    resolved = BREAK_RUN_RE.sub(replace, text).strip(" \t")
+    if LINE_START in resolved:
+        resolved = LINE_START_RE.sub(r"\1\\", resolved).replace(LINE_START, "")
+    return resolved
+
+
+class _MarkdownConverter:
+    def __init__(self, is_link: LinkPredicate):
+        self.is_link = is_link
+        self.links: List[Link] = []
+        # Per-node state kept while folding, keyed by id() of the owning node.
+        self.code: Dict[int, str] = {}
+        self.cells: Dict[int, List[str]] = {}
+        self.rows: Dict[int, List[Tuple[List[str], bool]]] = {}
+        self.list_counters: Dict[int, int] = {}
+
+    def place(self, pieces: List[str], item: Any, rendered: str) -> None:
+        tag = item.tag.lower()
+        attrs = item.attrs
+
+        if tag in DROPPED_ELEMENTS:
+            return
+        if self.is_link(tag, attrs):
+            href = attrs.get("href") or attrs.get("src") or ""
+            self.links.append(Link(text=ESCAPED_RE.sub(r"\1", _one_line(rendered)), href=href))
+
+        if tag in PARAGRAPH_ELEMENTS:
+            _block(pieces, rendered, PARAGRAPH_BREAK)
+        elif tag == "br":
+            # Void elements are never closed by the tree builder and may own what follows them.
+            pieces.append(LINE_BREAK)
+            pieces.append(rendered)
+        elif tag in EMPHASIS:
+            pieces.append(_wrap(rendered, EMPHASIS[tag]))
+        elif tag == "a":
+            pieces.append(_link(rendered, attrs.get("href")))
+        elif tag == "code":
+            self.code[id(item)] = rendered
+            pieces.append(_inline_code(rendered))
+        elif tag == "pre":
+            _block(pieces, self._fence(item, rendered), PARAGRAPH_BREAK)
+        elif tag in HEADINGS:
+            text = _one_line(rendered)
+            if text:
+                _block(pieces, f"{'#' * HEADINGS[tag]} {text}", PARAGRAPH_BREAK)
+        elif tag == "li":
+            _block(pieces, self._list_item(item, rendered), LINE_BREAK)
+        elif tag in ("ul", "ol"):
+            nested = item.parent is not None and item.parent.tag.lower() == "li"
+            _block(pieces, rendered, LINE_BREAK if nested else PARAGRAPH_BREAK)
+        elif tag == "blockquote":
+            lines = resolve_breaks(rendered).splitlines()
+            _block(pieces, "\n".join(f"> {line}" if line else ">" for line in lines), PARAGRAPH_BREAK)
+        elif tag == "hr":
+            _block(pieces, "---", PARAGRAPH_BREAK)
+            pieces.append(rendered)
+        elif tag == "img":
+            if attrs.get("src"):
+                pieces.append(f"![{attrs.get('alt') or ''}]({attrs['src']})")
+            pieces.append(rendered)
+        elif tag in ("td", "th") and item.parent is not None and item.parent.tag.lower() == "tr":
+            self.cells.setdefault(id(item.parent), []).append(
+                _one_line(rendered, "<br>").replace("|", "\\|")
+            )
+        elif tag == "tr":
+            self._row(item)
+        elif tag == "table":
+            _block(pieces, self._table(item, rendered), PARAGRAPH_BREAK)
+        elif tag in LINE_ELEMENTS:
+            _block(pieces, rendered, LINE_BREAK)
+        else:
+            pieces.append(rendered)
+
+    def _fence(self, pre: Any, rendered: str) -> str:
+        # Highlighted blocks carry a header (language label, copy button) beside <code>.
+        code_node = next(iter_find(pre, lambda node: node.tag.lower() == "code"), None)
+        if code_node is not None and id(code_node) in self.code:
+            code = self.code[id(code_node)]
+            language = _language(code_node.attrs.get("class")) or _language(pre.attrs.get("class"))
+        else:
+            code = rendered
+            language = _language(pre.attrs.get("class"))
+        code = code.replace(LINE_BREAK, "\n").replace(PARAGRAPH_BREAK, "\n").strip("\n")
+        fence = "```"
+        while fence in code:
+            fence += "`"
+        return f"{fence}{language}\n{code}\n{fence}"
+
+    def _list_item(self, item: Any, rendered: str) -> str:
+        parent = item.parent
+        prefix = "- "
+        if parent is not None and parent.tag.lower() == "ol":
+            key = id(parent)
+            if key not in self.list_counters:
+                self.list_counters[key] = _int(parent.attrs.get("start"), 1)
+            prefix = f"{self.list_counters[key]}. "
+            self.list_counters[key] += 1
+        lines = resolve_breaks(rendered).splitlines() or [""]
+        indent = " " * len(prefix)
+        rest = [f"{indent}{line}" if line.strip() else "" for line in lines[1:]]
+        return "\n".join([prefix + lines[0], *rest])
+
+    def _row(self, row: Any) -> None:
+        table = row.parent
+        header = False
+        if table is not None and table.tag.lower() in ("thead", "tbody", "tfoot"):
+            header = table.tag.lower() == "thead"
+            table = table.parent
+        if table is None or table.tag.lower() != "table":
+            return
+        cells = self.cells.pop(id(row), [])
+        if not header:
+            header = bool(cells) and all(
+                child.tag.lower() == "th" for child in row.children if child.tag.lower() in ("td", "th")
+            )
+        self.rows.setdefault(id(table), []).append((cells, header))
+
+    def _table(self, table: Any, rendered: str) -> str:
+        rows = self.rows.pop(id(table), [])
+        if not rows:
+            return rendered
+        header_index = next((idx for idx, (_, header) in enumerate(rows) if header), 0)
+        ordered = [rows[header_index][0]] + [cells for idx, (cells, _) in enumerate(rows) if idx != header_index]
+        width = max(len(cells) for cells in ordered) or 1
+        lines = []
+        for idx, cells in enumerate(ordered):
+            cells = cells + [""] * (width - len(cells))
+            lines.append("| " + " | ".join(cells) + " |")
+            if idx == 0:
+                lines.append("|" + " --- |" * width)
+        return "\n".join(lines)
+
+
+def _block(pieces: List[str], rendered: str, marker: str) -> None:
+    if not CONTENT_RE.search(rendered):
+        pieces.append(marker)
+        return
+    # A nested block already brings its own breaks. Wrapping it again at every level
+    # would grow the string with the nesting depth; a paragraph break already
+    # outranks a line break.
+    if rendered[0] != marker and rendered[0] != PARAGRAPH_BREAK:
+        pieces.append(marker)
+    pieces.append(rendered)
+    if rendered[-1] != marker and rendered[-1] != PARAGRAPH_BREAK:
+        pieces.append(marker)
+
+
+def _one_line(rendered: str, separator: str = " ") -> str:
+    # Joined lines are inline text, so nothing in them starts a block.
+    lines = resolve_breaks(rendered.replace(LINE_START, "")).splitlines()
+    return separator.join(line.strip() for line in lines if line.strip())
+
+
+def _escape_text(text: str) -> str:
+    text = INLINE_SYNTAX_RE.sub(r"\\\1", text)
+    match = LINE_SYNTAX_RE.match(text)
+    if match is None:
+        return text
+    return f"{text[: match.end()]}{LINE_START}{text[match.end() :]}"
+
+
+def _keeps_text(node: Any) -> bool:
+    return node.tag.lower() in ("code", "pre")
+
+
+def _wrap(rendered: str, marker: str) -> str:
+    text = rendered.strip()
+    if not text:
+        return rendered
+    leading = " " if rendered[:1].isspace() else ""
+    trailing = " " if rendered[-1:].isspace() else ""
+    return f"{leading}{marker}{text}{marker}{trailing}"
+
+
+def _link(rendered: str, href: Optional[str]) -> str:
+    text = _one_line(rendered)
+    if not href:
+        return rendered
+    return f"[{text or href}]({href})"
+
+
+def _inline_code(rendered: str) -> str:
+    text = rendered.replace(LINE_BREAK, " ").replace(PARAGRAPH_BREAK, " ")
+    if not text.strip():
+        return text
+    fence = "`"
+    while fence in text:
+        fence += "`"
+    padding = " " if text.startswith("`") or text.endswith("`") else ""
+    return f"{fence}{padding}{text}{padding}{fence}"
+
+
+def _language(class_attr: Optional[str]) -> str:
+    match = LANGUAGE_RE.search(class_attr or "")
+    return match.group(1) if match else ""
+
+
+def _int(value: Optional[str], default: int) -> int:
+    try:
+        return int(value) if value is not None else default
+    except ValueError:
+        return default
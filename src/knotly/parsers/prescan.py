@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import codecs
+import mmap
+import re
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+# Attribute names and class tokens that only appear on (or around) message markup.
+MESSAGE_MARKERS = (
+    b"data-message-author-role",
+    b"data-message-id",
+    b"conversation-turn",
+    b"data-author-role",
+    b"data-role",
+    b"data-turn",
+)
+BODY_MARKER = b"<body"
+TITLE_OPEN = b"<title"
+TITLE_CLOSE = b"</title>"
+# Saved pages end with large script bundles; the message region stops at the first one
+# after the last message element.
+TAIL_MARKER = b"<script"
+
+FEED_CHUNK_SIZE = 1 << 20
+
+# Markup tokens that change the tree builder's stack of open elements.
+TOKEN_RE = re.compile(rb"""<(/?)([a-zA-Z][^\s/>]*)(?:[^>"']|"[^"]*"|'[^']*')*>|<!--|<[!?][^>]*>""")
+RAW_TEXT_END = {b"script": re.compile(rb"</script", re.I), b"style": re.compile(rb"</style", re.I)}
+
+Region = Tuple[int, int]
+
+
+def find_regions(buffer: mmap.mmap) -> Optional[List[Region]]:
+    """Return the byte ranges worth parsing, or ``None`` when no message markers exist."""
+    size = len(buffer)
+    body = buffer.find(BODY_MARKER)
+    search_from = body if body >= 0 else 0
+
+    first = -1
+    last = -1
+    for marker in MESSAGE_MARKERS:
+        position = _find_in_tag(buffer, marker, search_from)
+        if position < 0:
+            continue
+        if first < 0 or position < first:
+            first = position
+        position = _rfind_in_tag(buffer, marker, search_from)
+        if position > last:
+            last = position
+    if first < 0:
+        return None
+
+    start = buffer.rfind(b"<", search_from, first)
+    if start < 0:
+        start = search_from
+    # Inline scripts inside the last message belong to it, so look past its end tag.
+    end = buffer.find(TAIL_MARKER, element_end(buffer, buffer.rfind(b"<", search_from, last)))
+    if end < 0:
+        end = size
+
+    regions: List[Region] = []
+    title = _find_title(buffer, body if body >= 0 else size)
+    if title:
+        if title[1] <= start:
+            regions.append(title)
+        else:
+            start = min(start, title[0])
+    # Ancestors carry ids and timestamps that messages inherit; feed their start tags too.
+    regions.extend(open_elements(buffer, start))
+    regions.sort()
+    regions.append((start, end))
+    return regions
+
+
+def open_elements(buffer: mmap.mmap, limit: int) -> List[Region]:
+    """Byte ranges of the start tags still open at ``limit``, outermost first.
+
+    Mirrors ``SoupParser``: every start tag is pushed (void elements included), and an
+    end tag pops up to the nearest element of the same name, or everything.
+    """
+    stack: List[Tuple[bytes, int, int]] = []
+    for closing, name, start, end in _tags(buffer, 0, limit):
+        if closing:
+            while stack:
+                if stack.pop()[0] == name:
+                    break
+        else:
+            stack.append((name, start, end))
+    return [(start, end) for _, start, end in stack]
+
+
+def element_end(buffer: mmap.mmap, start: int) -> int:
+    """The offset just past the end tag that closes the element whose start tag is at ``start``.
+
+    Follows the same stack rules as ``open_elements``; an end tag for an element
+    opened outside closes it too. Unclosed elements run to the end of the buffer.
+    """
+    names: List[bytes] = []
+    for closing, name, _, end in _tags(buffer, start, len(buffer)):
+        if not closing:
+            names.append(name)
+            continue
+        if name not in names:
+            return end
+        while names.pop() != name:
+            pass
+        if not names:
+            return end
+    return len(buffer)
+
+
+def _tags(buffer: mmap.mmap, position: int, limit: int) -> Iterator[Tuple[bool, bytes, int, int]]:
+    # (is end tag, lowercased name, start, end) for tags that change the stack of open
+    # elements; comments, raw text and self-closing tags leave it unchanged.
+    while True:
+        match = TOKEN_RE.search(buffer, position, limit)
+        if match is None:
+            return
+        position = match.end()
+        name = match.group(2)
+        if name is None:
+            if match.group() == b"<!--":
+                close = buffer.find(b"-->", position, limit)
+                position = limit if close < 0 else close + 3
+            continue
+        name = name.lower()
+        if match.group(1):
+            yield True, name, match.start(), position
+        elif name in RAW_TEXT_END:
+            close = RAW_TEXT_END[name].search(buffer, position, limit)
+            position = limit if close is None else close.end()
+        elif not match.group().endswith(b"/>"):
+            yield False, name, match.start(), position
+
+
+def feed_prescanned(parser: HTMLParser, path: Path) -> bool:
+    """Feed only the title and message region of ``path``; return ``False`` to request a full parse."""
+    with path.open("rb") as handle:
+        try:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped.
+            return False
+        with buffer:
+            regions = find_regions(buffer)
+            if not regions:
+                return False
+            with memoryview(buffer) as view:
+                for start, end in regions:
+                    with view[start:end] as region:
+                        _feed_view(parser, region)
+    return True
+
+
+def _feed_view(parser: HTMLParser, view: memoryview) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    for offset in range(0, len(view), FEED_CHUNK_SIZE):
+        with view[offset : offset + FEED_CHUNK_SIZE] as chunk:
+            parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+
+
+def _find_in_tag(buffer: mmap.mmap, marker: bytes, start: int) -> int:
+    # Skip occurrences in text or inline scripts: the marker must sit between a "<" and its ">".
+    position = buffer.find(marker, start)
+    while position >= 0:
+        opening = buffer.rfind(b"<", start, position)
+        if opening >= 0 and buffer.find(b">", opening, position) < 0:
+            return position
+        position = buffer.find(marker, position + len(marker))
+    return -1
+
+
+def _rfind_in_tag(buffer: mmap.mmap, marker: bytes, start: int) -> int:
+    # Same check as _find_in_tag, searching backwards; trailing script bundles often mention markers.
+    position = buffer.rfind(marker, start)
+    while position >= 0:
+        opening = buffer.rfind(b"<", start, position)
+        if opening < 0:
+            return -1
+        closing = buffer.find(b">", opening, position)
+        if closing < 0:
+            return position
+        # Every occurrence between this tag's ">" and ``position`` fails the same way.
+        position = buffer.rfind(marker, start, closing)
+    return -1
+
+
+def _find_title(buffer: mmap.mmap, limit: int) -> Optional[Region]:
+    start = buffer.find(TITLE_OPEN, 0, limit)
+    if start < 0:
+        return None
+    end = buffer.find(TITLE_CLOSE, start)
+    if end < 0:
+        return None
+    return start, end + len(TITLE_CLOSE)
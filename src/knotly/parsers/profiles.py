@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, fields
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Mapping, Optional, Tuple, Union
+
+SELECTOR_RE = re.compile(
+    r"""
+    (?P<tag>[a-zA-Z][\w-]*|\*)?
+    (?P<rest>(?:\.[\w-]+|\[[\w-]+(?:\^?=[^\]]*)?\])*)
+    """,
+    re.VERBOSE,
+)
+PART_RE = re.compile(r"\.(?P<cls>[\w-]+)|\[(?P<attr>[\w-]+)(?:(?P<op>\^?=)(?P<value>[^\]]*))?\]")
+
+# (attribute, operator, value); operator is "" (non-empty), "=" (equals) or "^=" (prefix).
+AttrCondition = Tuple[str, str, str]
+
+
+@dataclass(frozen=True)
+class SimpleSelector:
+    tag: Optional[str]
+    classes: FrozenSet[str]
+    attrs: Tuple[AttrCondition, ...]
+
+    def matches(self, attrs: Mapping[str, str], classes: Optional[FrozenSet[str]]) -> bool:
+        for name, op, expected in self.attrs:
+            value = attrs.get(name)
+            if not value:
+                return False
+            if op == "=" and value != expected:
+                return False
+            if op == "^=" and not value.startswith(expected):
+                return False
+        if self.classes:
+            if classes is None:
+                classes = frozenset(attrs.get("class", "").split())
+            if not self.classes <= classes:
+                return False
+        return True
+
+
+def parse_selector(selector: str) -> List[SimpleSelector]:
+    """Parse a comma-separated list of ``tag.class[attr][attr=value][attr^=prefix]`` selectors.
+
+    ``[attr]`` requires the attribute to be present with a non-empty value, matching
+    how the parser treats attributes everywhere else.
+    """
+    parsed: List[SimpleSelector] = []
+    for raw in selector.split(","):
+        raw = raw.strip()
+        if not raw:
+            continue
+        match = SELECTOR_RE.fullmatch(raw)
+        if not match or not (match.group("tag") or match.group("rest")):
+            raise ValueError(f"Unsupported selector: {raw!r}")
+        tag = match.group("tag")
+        classes = set()
+        conditions = []
+        for part in PART_RE.finditer(match.group("rest")):
+            if part.group("cls"):
+                classes.add(part.group("cls"))
+            else:
+                value = (part.group("value") or "").strip().strip("'\"")
+                conditions.append((part.group("attr").lower(), part.group("op") or "", value))
+        parsed.append(
+            SimpleSelector(
+                tag=None if tag in (None, "*") else tag.lower(),
+                classes=frozenset(classes),
+                attrs=tuple(conditions),
+            )
+        )
+    return parsed
+
+
+class SelectorSet:
+    """Several named selectors compiled into one tag-dispatched classifier.
+
+    ``classify`` evaluates every selector against a node with a single dict lookup
+    on the tag and returns a bit mask of the selectors that matched.
+    """
+
+    def __init__(self, selectors: Mapping[str, str]):
+        self.flags: Dict[str, int] = {}
+        self._by_tag: Dict[str, List[Tuple[int, SimpleSelector]]] = {}
+        self._any_tag: List[Tuple[int, SimpleSelector]] = []
+        for position, (name, selector) in enumerate(selectors.items()):
+            flag = 1 << position
+            self.flags[name] = flag
+            for simple in parse_selector(selector):
+                if simple.tag is None:
+                    self._any_tag.append((flag, simple))
+                else:
+                    self._by_tag.setdefault(simple.tag, []).append((flag, simple))
+        for tag, checks in self._by_tag.items():
+            checks.extend(self._any_tag)
+
+    def classify(self, tag: str, attrs: Mapping[str, str]) -> int:
+        checks = self._by_tag.get(tag, self._any_tag)
+        if not checks:
+            return 0
+        mask = 0
+        classes: Optional[FrozenSet[str]] = None
+        for flag, simple in checks:
+            if mask & flag:
+                continue
+            if simple.classes and classes is None:
+                classes = frozenset(attrs.get("class", "").split())
+            if simple.matches(attrs, classes):
+                mask |= flag
+        return mask
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector: str) -> Callable[[str, Mapping[str, str]], bool]:
+    selector_set = SelectorSet({"match": selector})
+    return lambda tag, attrs: bool(selector_set.classify(tag, attrs))
+
+
+@dataclass(frozen=True)
+class ExtractorProfile:
+    """Declarative description of where messages live in a saved page."""
+
+    name: str
+    # Every element that may hold a message.
+    message: str
+    # Candidates carrying explicit message attributes; preferred over the rest when present.
+    preferred: str = ""
+    # Ordered (selector, priority) pairs used to pick one node among duplicates of a message.
+    priorities: Tuple[Tuple[str, int], ...] = ()
+    # Attributes, looked up on the node and its ancestors, that identify a message for dedup.
+    key_attributes: Tuple[str, ...] = ()
+    # Used only when no message candidates are found.
+    fallback: str = ""
+    # First matching descendant of a message holds its body; the message itself otherwise.
+    content: str = ""
+    link: str = "a[href]"
+    title: str = "title"
+    role_attributes: Tuple[str, ...] = ()
+    author_attribute: str = ""
+    timestamp_attributes: Tuple[str, ...] = ()
+    turn_id_attributes: Tuple[str, ...] = ()
+    data_turn_attributes: Tuple[str, ...] = ()
+    # Roles assigned in turn order to messages without a role attribute (older pages alternate).
+    role_cycle: Tuple[str, ...] = ()
+
+
+class CompiledProfile:
+    def __init__(self, profile: ExtractorProfile):
+        self.profile = profile
+        self.selectors = SelectorSet(
+            {
+                "message": profile.message,
+                "fallback": profile.fallback,
+                "content": profile.content,
+                "link": profile.link,
+                "title": profile.title,
+            }
+        )
+        self.message_flag = self.selectors.flags["message"]
+        self.fallback_flag = self.selectors.flags["fallback"]
+        self.content_flag = self.selectors.flags["content"]
+        self.link_flag = self.selectors.flags["link"]
+        self.title_flag = self.selectors.flags["title"]
+        self.is_preferred = compile_selector(profile.preferred) if profile.preferred else None
+        self.priorities = [(compile_selector(selector), priority) for selector, priority in profile.priorities]
+
+    def priority(self, tag: str, attrs: Mapping[str, str]) -> int:
+        for matcher, priority in self.priorities:
+            if matcher(tag, attrs):
+                return priority
+        return 0
+
+
+MESSAGE_TAGS = ("div", "article", "section")
+MESSAGE_ATTRIBUTES = (
+    "data-message-id",
+    "data-role",
+    "data-author-role",
+    "data-message-author-role",
+    "data-turn",
+)
+
+CHATGPT_PROFILE = ExtractorProfile(
+    name="chatgpt",
+    message=", ".join(
+        [f"{tag}[{attr}]" for tag in MESSAGE_TAGS for attr in MESSAGE_ATTRIBUTES]
+        + [f"{tag}.conversation-turn" for tag in MESSAGE_TAGS]
+    ),
+    preferred="[data-message-id], [data-message-author-role], [data-role], [data-author-role]",
+    priorities=(
+        ("[data-message-author-role]", 4),
+        ("[data-message-id]", 3),
+        ("[data-role], [data-author-role]", 2),
+        ("[data-turn]", 1),
+    ),
+    key_attributes=("data-message-id", "data-turn-id", "id"),
+    fallback="div.text-base",
+    content="div.message-content",
+    role_attributes=("data-role", "data-author-role", "data-message-author-role"),
+    author_attribute="data-author-name",
+    timestamp_attributes=("data-timestamp", "data-created"),
+    turn_id_attributes=("data-message-id", "id", "data-turn-id"),
+    data_turn_attributes=("data-turn",),
+)
+
+# Pages saved before messages carried role attributes: each turn is a div.text-base row,
+# user text sits in div.whitespace-pre-wrap and replies in div.markdown.
+LEGACY_CHATGPT_PROFILE = ExtractorProfile(
+    name="chatgpt-legacy",
+    message="div.text-base",
+    content="div.markdown, div.whitespace-pre-wrap",
+    role_attributes=("data-message-author-role",),
+    timestamp_attributes=("data-timestamp", "data-created"),
+    turn_id_attributes=("data-message-id", "data-testid"),
+    role_cycle=("user", "assistant"),
+)
+
+DEFAULT_PROFILE = CHATGPT_PROFILE.name
+
+PROFILES: Dict[str, ExtractorProfile] = {}
+_COMPILED: Dict[str, CompiledProfile] = {}
+
+
+def register_profile(profile: ExtractorProfile) -> None:
+    PROFILES[profile.name] = profile
+    _COMPILED.pop(profile.name, None)
+
+
+def get_profile(profile: Union[str, ExtractorProfile]) -> CompiledProfile:
+    if isinstance(profile, ExtractorProfile):
+        return CompiledProfile(profile)
+    compiled = _COMPILED.get(profile)
+    if compiled is None:
+        if profile not in PROFILES:
+            known = ", ".join(sorted(PROFILES))
+            raise ValueError(f"Unknown extractor profile {profile!r} (known: {known})")
+        compiled = _COMPILED[profile] = CompiledProfile(PROFILES[profile])
+    return compiled
+
+
+def load_profile(path: Path) -> ExtractorProfile:
+    """Read a profile from a JSON object whose keys are ``ExtractorProfile`` fields.
+
+    Lists become tuples and ``priorities`` is a list of ``[selector, priority]`` pairs.
+    Selectors are compiled here, so a malformed file fails before any page is parsed.
+    """
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected a JSON object")
+    unknown = sorted(set(data) - {item.name for item in fields(ExtractorProfile)})
+    if unknown:
+        raise ValueError(f"{path}: unknown profile fields {', '.join(unknown)}")
+    missing = [name for name in ("name", "message") if not data.get(name)]
+    if missing:
+        raise ValueError(f"{path}: missing {', '.join(missing)}")
+    values = {}
+    for key, value in data.items():
+        if key == "priorities":
+            value = tuple((str(selector), int(priority)) for selector, priority in value)
+        elif isinstance(value, list):
+            value = tuple(value)
+        values[key] = value
+    profile = ExtractorProfile(**values)
+    CompiledProfile(profile)
+    return profile
+
+
+register_profile(CHATGPT_PROFILE)
+register_profile(LEGACY_CHATGPT_PROFILE)
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+TurnRange = Tuple[int, Optional[int]]
+
+
+@dataclass(frozen=True)
+class TurnSelection:
+    """Which turns to extract, by 1-based turn number range and by role.
+
+    An empty ``ranges`` or ``roles`` matches everything. Turn numbers always refer
+    to the full conversation, so a selected turn keeps the number it has in a full build.
+    """
+
+    ranges: Tuple[TurnRange, ...] = ()
+    roles: Tuple[str, ...] = ()
+
+    def includes(self, turn_index: int, role: Optional[str]) -> bool:
+        if self.roles and (role or "").lower() not in self.roles:
+            return False
+        if not self.ranges:
+            return True
+        return any(start <= turn_index and (end is None or turn_index <= end) for start, end in self.ranges)
+
+
+def parse_turn_ranges(text: str) -> Tuple[TurnRange, ...]:
+    """Parse ``"5,10-20,500-"`` into inclusive ``(start, end)`` ranges; ``end`` ``None`` is open."""
+    ranges = []
+    for part in text.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start_text, dash, end_text = part.partition("-")
+        try:
+            start = int(start_text) if start_text.strip() else 1
+            end = (int(end_text) if end_text.strip() else None) if dash else start
+        except ValueError:
+            raise ValueError(f"invalid turn range {part!r}") from None
+        if start < 1 or (end is not None and end < start):
+            raise ValueError(f"invalid turn range {part!r}")
+        ranges.append((start, end))
+    if not ranges:
+        raise ValueError(f"no turn ranges in {text!r}")
+    return tuple(ranges)
+
+
+def parse_roles(text: str) -> Tuple[str, ...]:
+    roles = tuple(dict.fromkeys(role.strip().lower() for role in text.split(",") if role.strip()))
+    if not roles:
+        raise ValueError(f"no roles in {text!r}")
+    return roles
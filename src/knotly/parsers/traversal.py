@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterator, List, Optional
+
+# Return values for ``enter`` callbacks passed to ``walk``.
+SKIP = object()  # do not descend into the node, and do not call ``leave`` for it
+STOP = object()  # end the traversal immediately
+
+
+def walk(
+    root: Any,
+    enter: Optional[Callable[[Any], object]] = None,
+    leave: Optional[Callable[[Any], None]] = None,
+) -> None:
+    """Depth-first traversal with an explicit stack.
+
+    ``enter`` is called in preorder and ``leave`` in postorder, so arbitrarily deep
+    trees never touch the interpreter's recursion limit.
+    """
+    stack: List[Any] = [root]
+    leaving: List[bool] = [False]
+    while stack:
+        node = stack.pop()
+        if leaving.pop():
+            leave(node)  # type: ignore[misc]
+            continue
+        if enter is not None:
+            action = enter(node)
+            if action is SKIP:
+                continue
+            if action is STOP:
+                return
+        if leave is not None:
+            stack.append(node)
+            leaving.append(True)
+        items = node.children
+        if items:
+            stack.extend(reversed(items))
+            leaving.extend([False] * len(items))
+
+
+def iter_find(root: Any, predicate: Callable[[Any], bool]) -> Iterator[Any]:
+    """Yield nodes matching ``predicate`` in document order; stop consuming to stop the walk."""
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        if predicate(node):
+            yield node
+        children = node.children
+        if children:
+            stack += children[::-1]
+
+
+def iter_text(root: Any) -> Iterator[str]:
+    stack = [iter(root._contents)]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, str):
+                yield item
+            else:
+                stack.append(iter(item._contents))
+                break
+        else:
+            stack.pop()
+
+
+def fold_contents(
+    root: Any,
+    place: Callable[[List[str], Any, str], None],
+    text: Optional[Callable[[str], str]] = None,
+    keeps_text: Optional[Callable[[Any], bool]] = None,
+) -> str:
+    """Render ``root`` bottom-up over its mixed text/node contents without recursion.
+
+    Text items are appended as they are met, rewritten by ``text`` unless they sit
+    inside a node for which ``keeps_text`` is true. When a child node is finished,
+    its joined pieces are handed to ``place(parent_pieces, child, rendered)`` (a
+    postorder visit) which decides how they land in the parent's pieces.
+    """
+    if text is not None and keeps_text is not None and keeps_text(root):
+        text = None
+    frames = [(root, [], iter(root._contents), text)]
+    while True:
+        node, pieces, items, convert = frames[-1]
+        for item in items:
+            if item.__class__ is str:
+                pieces.append(item if convert is None else convert(item))
+            else:
+                if convert is not None and keeps_text is not None and keeps_text(item):
+                    frames.append((item, [], iter(item._contents), None))
+                else:
+                    frames.append((item, [], iter(item._contents), convert))
+                break
+        else:
+            frames.pop()
+            rendered = "".join(pieces)
+            if not frames:
+                return rendered
+            place(frames[-1][1], node, rendered)
@@ -1,22 +1,63 @@
 from __future__ import annotations
 
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple, Union
 
+from .catalog import Catalog, CatalogEntry, hash_file, options_fingerprint, utc_now
 from .models import Conversation
-from .parsers import parse_html_export
-from .utils import mnemonic_from_content
-from .writers import OutputWriter, Plan
+from .parsers import (
+    DEFAULT_PROFILE,
+    ExtractorProfile,
+    LayoutTable,
+    ResourceGuard,
+    ResourceLimits,
+    ResourceUsage,
+    TurnSelection,
+    conversation_from_export,
+    iter_export_conversations,
+    parse_html_export,
+    stream_html_export,
+)
+from .utils import slugify
+from .writers import JsonLinesWriter, OutputWriter, Plan, create_writer
 from .console import Console
 
-console = Console()
+default_console = Console()
+
+
+# build_conversation options that change the generated notes; they form the catalog fingerprint.
+OUTPUT_OPTIONS = (
+    "title",
+    "parent_name",
+    "timezone",
+    "by_title",
+    "profile",
+    "shard_size",
+    "turn_template",
+    "parent_template",
+    "selection",
+    "knots",
+    "content_format",
+)
 
 
 class BuildResult:
-    def __init__(self, conversation: Conversation, plan: Plan, writer: OutputWriter):
+    def __init__(
+        self,
+        conversation: Conversation,
+        plan: Plan,
+        writer: OutputWriter,
+        timings: Optional[Dict[str, float]] = None,
+        usage: Optional[ResourceUsage] = None,
+    ):
         self.conversation = conversation
         self.plan = plan
         self.writer = writer
+        self.timings = timings or {}
+        self.usage = usage
 
 
 def build_conversation(
@@ -29,21 +70,55 @@ def build_conversation(
     dry_run: bool = False,
     timezone: Optional[str] = None,
     by_title: bool = False,
+    prescan: bool = False,
+    profile: Union[str, ExtractorProfile] = DEFAULT_PROFILE,
+    workers: int = 1,
+    selection: Optional[TurnSelection] = None,
+    content_format: str = "text",
+    archive_format: Optional[str] = None,
+    shard_size: Optional[int] = None,
+    turn_template: Optional[str] = None,
+    parent_template: Optional[str] = None,
+    knots: bool = False,
+    limits: Optional[ResourceLimits] = None,
+    layouts: Optional[LayoutTable] = None,
     verbose: bool = False,
+    console: Optional[Console] = None,
 ) -> BuildResult:
+    console = console or default_console
     if verbose:
         console.log(f"Loading conversation from {input_path} (html)")
 
+    started = time.perf_counter()
+    guard = ResourceGuard(limits)
     conversation = parse_html_export(
         input_path,
         timezone=timezone,
         title=title,
         by_title=by_title,
+        prescan=prescan,
+        profile=profile,
+        workers=workers,
+        selection=selection,
+        guard=guard,
+        content_format=content_format,
+        layouts=layouts,
     )
 
-    _stabilize_mnemonics(conversation)
+    parsed = time.perf_counter()
+    if verbose:
+        console.log(f"Resources: {guard.usage.summary()}")
+        _log_layouts(layouts, console)
 
-    writer = OutputWriter(output_dir, parent_name=parent_name)
+    writer = create_writer(
+        output_dir,
+        parent_name=parent_name,
+        archive_format=archive_format,
+        shard_size=shard_size,
+        turn_template=turn_template,
+        parent_template=parent_template,
+        knots=knots,
+    )
     plan = writer.plan(conversation)
     writer.prepare(plan, force=force)
 
@@ -59,25 +134,229 @@ def build_conversation(
         if verbose:
             console.log("Dry run complete; no files written.")
 
-    return BuildResult(conversation, plan, writer)
-
-
-def _stabilize_mnemonics(conversation: Conversation) -> None:
-    seen = {}
-    for turn in conversation.turns:
-        base = turn.mnemonic or mnemonic_from_content(turn.content)
-        suffix = ""
-        counter = 0
-        slug = base
-        while slug in seen:
-            counter += 1
-            if counter <= 26:
-                suffix = f"-{chr(ord('a') + counter - 1)}"
-            else:
-                suffix = f"-{counter:02d}"
-            slug = base
-            if len(base) + len(suffix) > 60:
-                slug = base[: 60 - len(suffix)].rstrip("-")
-            slug = f"{slug}{suffix}"
-        seen[slug] = True
-        turn.mnemonic = slug
+    timings = {"parse": parsed - started, "write": time.perf_counter() - parsed}
+    return BuildResult(conversation, plan, writer, timings, guard.usage)
+
+
+def build_cataloged(
+    catalog: Catalog,
+    *,
+    input_path: Path,
+    output_dir: Path,
+    index_note: Optional[Path] = None,
+    **options: Any,
+) -> Optional[BuildResult]:
+    """Build unless the catalog already holds this input with the same output options.
+
+    Returns ``None`` when the input is skipped. ``force`` rebuilds regardless.
+    """
+    fingerprint = {name: options[name] for name in OUTPUT_OPTIONS if name in options}
+    fingerprint["output_dir"] = str(output_dir.resolve())
+    input_hash = hash_file(input_path)
+    options_hash = options_fingerprint(fingerprint)
+
+    existing = catalog.lookup(input_hash, options_hash)
+    if existing and existing.parent_path.exists() and not options.get("force"):
+        if options.get("verbose"):
+            console = options.get("console") or default_console
+            console.log(f"Skipping {input_path}: already converted to {existing.output_dir}")
+        return None
+
+    result = build_conversation(input_path=input_path, output_dir=output_dir, **options)
+    if options.get("dry_run"):
+        return result
+
+    entry = CatalogEntry(
+        input_hash=input_hash,
+        options_hash=options_hash,
+        input_path=str(input_path.resolve()),
+        output_dir=str(output_dir.resolve()),
+        parent_name=result.writer.parent_name,
+        title=result.conversation.title,
+        turn_count=len(result.conversation.turns),
+        parse_seconds=result.timings["parse"],
+        write_seconds=result.timings["write"],
+        processed_at=utc_now(),
+    )
+    catalog.record(entry)
+    if index_note is not None:
+        catalog.update_index_note(index_note, entry)
+    return result
+
+
+def stream_conversation(
+    *,
+    input_path: Path,
+    stream: TextIO,
+    title: Optional[str] = None,
+    timezone: Optional[str] = None,
+    by_title: bool = False,
+    prescan: bool = False,
+    profile: Union[str, ExtractorProfile] = DEFAULT_PROFILE,
+    workers: int = 1,
+    selection: Optional[TurnSelection] = None,
+    content_format: str = "text",
+    limits: Optional[ResourceLimits] = None,
+    layouts: Optional[LayoutTable] = None,
+    verbose: bool = False,
+    console: Optional[Console] = None,
+) -> int:
+    console = console or default_console
+    if verbose:
+        console.log(f"Streaming conversation from {input_path} (html) as JSON lines")
+
+    guard = ResourceGuard(limits)
+    conversation, turns = stream_html_export(
+        input_path,
+        timezone=timezone,
+        title=title,
+        by_title=by_title,
+        prescan=prescan,
+        profile=profile,
+        workers=workers,
+        selection=selection,
+        guard=guard,
+        content_format=content_format,
+        layouts=layouts,
+    )
+
+    writer = JsonLinesWriter(stream)
+    writer.write_conversation(conversation)
+    for turn in turns:
+        writer.write_turn(turn)
+    writer.close()
+
+    if verbose:
+        console.log(f"Streamed {writer.turn_count} turns.")
+        console.log(f"Resources: {guard.usage.summary()}")
+        _log_layouts(layouts, console)
+    return writer.turn_count
+
+
+def _log_layouts(layouts: Optional[LayoutTable], console: Console) -> None:
+    if layouts is not None:
+        console.log(f"Layouts: {layouts.known} known, {layouts.learned} learned")
+
+
+class ExportResult:
+    def __init__(self, output_dir: Path, title: str, turn_count: int, file_count: int):
+        self.output_dir = output_dir
+        self.title = title
+        self.turn_count = turn_count
+        self.file_count = file_count
+
+
+def build_export(
+    *,
+    input_path: Path,
+    output_dir: Path,
+    parent_name: str = "Conversation.md",
+    force: bool = False,
+    dry_run: bool = False,
+    timezone: Optional[str] = None,
+    shard_size: Optional[int] = None,
+    turn_template: Optional[str] = None,
+    parent_template: Optional[str] = None,
+    selection: Optional[TurnSelection] = None,
+    knots: bool = False,
+    workers: int = 1,
+    limits: Optional[ResourceLimits] = None,
+    verbose: bool = False,
+    console: Optional[Console] = None,
+) -> List[ExportResult]:
+    """Convert every conversation of a ChatGPT ``conversations.json`` into its own folder.
+
+    Conversations are read incrementally and rendered in ``workers`` processes, with at
+    most two per worker in flight so memory stays bounded on very large exports.
+    ``limits`` bound the file size, mapping nodes and time for the whole export, and
+    the branch depth and turn length of each conversation.
+    """
+    console = console or default_console
+    if verbose:
+        console.log(f"Loading conversations from {input_path} (ChatGPT export)")
+
+    guard = ResourceGuard(limits)
+    guard.check_input(input_path.stat().st_size)
+
+    options = dict(
+        parent_name=parent_name,
+        force=force,
+        dry_run=dry_run,
+        timezone=timezone,
+        shard_size=shard_size,
+        turn_template=turn_template,
+        parent_template=parent_template,
+        selection=selection,
+        knots=knots,
+        limits=limits,
+    )
+    used: Dict[str, int] = {}
+
+    def jobs() -> Iterator[Tuple[Dict[str, Any], Path, Dict[str, Any]]]:
+        for index, raw in enumerate(iter_export_conversations(input_path), start=1):
+            guard.enter_tree(len(raw.get("mapping") or {}), 0)
+            yield raw, output_dir / export_folder_name(raw, index, used), options
+
+    results: List[ExportResult] = []
+    if workers <= 1:
+        for job in jobs():
+            results.append(_build_export_conversation(*job))
+            _log_export(results[-1], verbose, console)
+        _log_resources(guard, verbose, console)
+        return results
+
+    pending: Deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for job in jobs():
+            pending.append(executor.submit(_build_export_conversation, *job))
+            if len(pending) >= workers * 2:
+                results.append(pending.popleft().result())
+                _log_export(results[-1], verbose, console)
+        while pending:
+            results.append(pending.popleft().result())
+            _log_export(results[-1], verbose, console)
+    _log_resources(guard, verbose, console)
+    return results
+
+
+def export_folder_name(raw: Dict[str, Any], index: int, used: Dict[str, int]) -> str:
+    """Name a conversation's folder after its title plus a short id, unique within ``used``."""
+    slug = slugify(raw.get("title") or "conversation", max_length=50)
+    conversation_id = raw.get("conversation_id") or raw.get("id")
+    name = f"{slug}-{str(conversation_id)[:8]}" if conversation_id else f"{slug}-{index:04d}"
+    count = used.get(name, 0)
+    used[name] = count + 1
+    return f"{name}-{count + 1}" if count else name
+
+
+def _build_export_conversation(raw: Dict[str, Any], output_dir: Path, options: Dict[str, Any]) -> ExportResult:
+    conversation = conversation_from_export(
+        raw,
+        timezone=options["timezone"],
+        selection=options["selection"],
+        guard=ResourceGuard(options["limits"]),
+    )
+    writer = create_writer(
+        output_dir,
+        parent_name=options["parent_name"],
+        shard_size=options["shard_size"],
+        turn_template=options["turn_template"],
+        parent_template=options["parent_template"],
+        knots=options["knots"],
+    )
+    plan = writer.plan(conversation)
+    writer.prepare(plan, force=options["force"])
+    if not options["dry_run"]:
+        writer.write(plan)
+    return ExportResult(output_dir, conversation.title, len(conversation.turns), len(plan.files))
+
+
+def _log_export(result: ExportResult, verbose: bool, console: Console) -> None:
+    if verbose:
+        console.log(f"{result.output_dir}: {result.title} ({result.turn_count} turns)")
+
+
+def _log_resources(guard: ResourceGuard, verbose: bool, console: Console) -> None:
+    if verbose:
+        guard.check_time()
+        console.log(f"Resources: {guard.usage.summary()}")
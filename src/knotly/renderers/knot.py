@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from ..knots import Knot
+from .parent import turn_filename
+
+
+def render_knot(knot: Knot, *, parent_name: str) -> str:
+    lines = [f"# Knot {knot.index}: turns {knot.first_turn}-{knot.last_turn}", ""]
+    lines.append(f"Up: [[{Path(parent_name).stem}]]")
+    lines.append("")
+    lines.append("## Turns")
+    lines.append("")
+    for turn in knot.turns:
+        lines.append(f"- [[{turn_filename(turn)}]]")
+    return "\n".join(lines) + "\n"
@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 from pathlib import Path
+from typing import Dict, List, Optional
 
-from ..models import Conversation
+from ..knots import Knot
+from ..models import Conversation, Turn
 
 
-def render_parent(conversation: Conversation, *, parent_name: str) -> str:
+def render_parent(
+    conversation: Conversation,
+    *,
+    parent_name: str,
+    shard_size: Optional[int] = None,
+    knots: Optional[List[Knot]] = None,
+) -> str:
     lines = []
 
     title = (conversation.title or "").strip()
@@ -15,11 +23,64 @@ def render_parent(conversation: Conversation, *, parent_name: str) -> str:
         lines.append(f"# {title}")
         lines.append("")
 
+    if knots:
+        lines.append("## Knots")
+        lines.append("")
+        lines.extend(render_knot_lines(knots))
+        lines.append("")
+
     lines.append("## Turns")
     lines.append("")
-
-    for turn in conversation.turns:
-        filename = f"turn{turn.turn_index:03d}_{turn.mnemonic}.md"
-        lines.append(f"- [[{filename}]]")
+    lines.extend(render_parent_lines(conversation, parent_name=parent_name, shard_size=shard_size))
     lines.append("")
     return "\n".join(lines).strip() + "\n"
+
+
+def render_parent_lines(conversation: Conversation, *, parent_name: str, shard_size: Optional[int] = None) -> List[str]:
+    """The parent's link list: one line per turn, or per shard when ``shard_size`` is set."""
+    if shard_size:
+        return [
+            f"- [[{shard_filename(parent_name, start, shard_size)}]]"
+            for start in shard_turns(conversation.turns, shard_size)
+        ]
+    return [f"- [[{turn_filename(turn)}]]" for turn in conversation.turns]
+
+
+def render_parent_shards(conversation: Conversation, *, parent_name: str, shard_size: int) -> Dict[str, str]:
+    """Render one range sub-index per ``shard_size`` turns, keyed by filename.
+
+    Shards cover fixed turn-number ranges, so their names stay stable as turns are
+    appended and only the last shard changes.
+    """
+    shards = {}
+    for start, turns in shard_turns(conversation.turns, shard_size).items():
+        end = start + shard_size - 1
+        lines = [f"## Turns {start}-{end}", ""]
+        for turn in turns:
+            lines.append(f"- [[{turn_filename(turn)}]]")
+        shards[shard_filename(parent_name, start, shard_size)] = "\n".join(lines) + "\n"
+    return shards
+
+
+def shard_turns(turns: List[Turn], shard_size: int) -> Dict[int, List[Turn]]:
+    shards: Dict[int, List[Turn]] = {}
+    for turn in turns:
+        start = (turn.turn_index - 1) // shard_size * shard_size + 1
+        shards.setdefault(start, []).append(turn)
+    return shards
+
+
+def shard_filename(parent_name: str, start: int, shard_size: int) -> str:
+    return f"{Path(parent_name).stem}_turns{start:03d}-{start + shard_size - 1:03d}.md"
+
+
+def turn_filename(turn: Turn) -> str:
+    return f"turn{turn.turn_index:03d}_{turn.mnemonic}.md"
+
+
+def render_knot_lines(knots: List[Knot]) -> List[str]:
+    return [f"- [[{knot_filename(knot)}]] (turns {knot.first_turn}-{knot.last_turn})" for knot in knots]
+
+
+def knot_filename(knot: Knot) -> str:
+    return f"knot{knot.index:03d}_{knot.turns[0].mnemonic}.md"
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import json
+import re
+from datetime import datetime
+from functools import lru_cache
+from json.encoder import encode_basestring
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..knots import Knot
+from ..models import Conversation, Turn
+from .parent import render_knot_lines, render_parent_lines, turn_filename
+
+# ``{{ field }}`` or ``{{ field|filter }}``.
+PLACEHOLDER_RE = re.compile(r"\{\{\s*(\w+)\s*(?:\|\s*(\w+)\s*)?\}\}")
+
+TurnRenderer = Callable[..., str]
+ParentRenderer = Callable[..., str]
+
+
+def _text(value: Any) -> str:
+    if value.__class__ is str:
+        return value
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return ", ".join(_text(item) for item in value)
+    return str(value)
+
+
+def _yaml(value: Any) -> str:
+    """Render a YAML flow scalar or sequence; JSON strings are valid double-quoted YAML."""
+    if value.__class__ is str:
+        return encode_basestring(value)
+    if value is None:
+        return "null"
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, tuple):
+        value = list(value)
+    return _json_encode(value)
+
+
+_json_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+FILTERS: Dict[Optional[str], Callable[[Any], str]] = {None: _text, "yaml": _yaml}
+
+
+@lru_cache(maxsize=None)
+def _stem(parent_name: str) -> str:
+    return Path(parent_name).stem
+
+
+def _links(turn: Turn) -> str:
+    return "\n".join(f"- [{link.text}]({link.href})" for link in turn.links)
+
+
+TURN_FIELDS: Dict[str, Callable[[Turn, Conversation, str], Any]] = {
+    "turn_index": lambda turn, conversation, parent_name: turn.turn_index,
+    "turn_id": lambda turn, conversation, parent_name: turn.turn_id,
+    "role": lambda turn, conversation, parent_name: turn.role,
+    "author": lambda turn, conversation, parent_name: turn.author,
+    "data_turn": lambda turn, conversation, parent_name: turn.data_turn,
+    "created_at": lambda turn, conversation, parent_name: turn.created_at,
+    "content": lambda turn, conversation, parent_name: turn.content,
+    "mnemonic": lambda turn, conversation, parent_name: turn.mnemonic,
+    "links": lambda turn, conversation, parent_name: _links(turn),
+    "filename": lambda turn, conversation, parent_name: turn_filename(turn),
+    "title": lambda turn, conversation, parent_name: conversation.title,
+    "model": lambda turn, conversation, parent_name: conversation.model,
+    "conversation_id": lambda turn, conversation, parent_name: conversation.conversation_id,
+    "parent": lambda turn, conversation, parent_name: _stem(parent_name),
+}
+
+PARENT_FIELDS: Dict[str, Callable[[Conversation, str, Optional[int], Optional[List[Knot]]], Any]] = {
+    "title": lambda conversation, parent_name, shard_size, knots: conversation.title,
+    "model": lambda conversation, parent_name, shard_size, knots: conversation.model,
+    "conversation_id": lambda conversation, parent_name, shard_size, knots: conversation.conversation_id,
+    "exported_at": lambda conversation, parent_name, shard_size, knots: conversation.exported_at,
+    "participants": lambda conversation, parent_name, shard_size, knots: conversation.participants,
+    "turn_count": lambda conversation, parent_name, shard_size, knots: len(conversation.turns),
+    "turns": lambda conversation, parent_name, shard_size, knots: "\n".join(
+        render_parent_lines(conversation, parent_name=parent_name, shard_size=shard_size)
+    ),
+    "knots": lambda conversation, parent_name, shard_size, knots: "\n".join(render_knot_lines(knots or [])),
+    "parent": lambda conversation, parent_name, shard_size, knots: _stem(parent_name),
+}
+
+
+def compile_template(text: str, fields: Dict[str, Callable[..., Any]]) -> Callable[..., str]:
+    """Compile ``text`` into a function of the field getters' arguments.
+
+    Placeholders are resolved once: the template becomes a positional ``str.format``
+    pattern plus a list of (getter, filter) pairs, so rendering is one format call.
+    """
+    pattern: List[str] = []
+    getters: List[Tuple[Callable[..., Any], Callable[[Any], str]]] = []
+    position = 0
+    for match in PLACEHOLDER_RE.finditer(text):
+        name, filter_name = match.groups()
+        if name not in fields:
+            raise ValueError(f"Unknown template field {name!r}; expected one of: {', '.join(sorted(fields))}")
+        if filter_name not in FILTERS:
+            raise ValueError(f"Unknown template filter {filter_name!r}; expected one of: yaml")
+        pattern.append(_escape(text[position : match.start()]))
+        pattern.append(f"{{{len(getters)}}}")
+        getters.append((fields[name], FILTERS[filter_name]))
+        position = match.end()
+    pattern.append(_escape(text[position:]))
+    if not text.endswith("\n"):
+        pattern.append("\n")
+
+    compiled = "".join(pattern)
+
+    def render(*args: Any) -> str:
+        return compiled.format(*[convert(get(*args)) for get, convert in getters])
+
+    return render
+
+
+def _escape(literal: str) -> str:
+    return literal.replace("{", "{{").replace("}", "}}")
+
+
+@lru_cache(maxsize=None)
+def compile_turn_template(text: str) -> TurnRenderer:
+    """Compile a turn note template into a drop-in replacement for ``render_turn``."""
+    render = compile_template(text, TURN_FIELDS)
+
+    def render_turn(turn: Turn, conversation: Conversation, *, parent_name: str) -> str:
+        return render(turn, conversation, parent_name)
+
+    return render_turn
+
+
+@lru_cache(maxsize=None)
+def compile_parent_template(text: str) -> ParentRenderer:
+    """Compile a parent note template into a drop-in replacement for ``render_parent``."""
+    render = compile_template(text, PARENT_FIELDS)
+
+    def render_parent(
+        conversation: Conversation,
+        *,
+        parent_name: str,
+        shard_size: Optional[int] = None,
+        knots: Optional[List[Knot]] = None,
+    ) -> str:
+        return render(conversation, parent_name, shard_size, knots)
+
+    return render_parent
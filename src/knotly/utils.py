@@ -4,10 +4,13 @@ import re
 import unicodedata
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import TYPE_CHECKING, Dict, Iterable, Optional
 
 from zoneinfo import ZoneInfo
 
+if TYPE_CHECKING:
+    from .models import Turn
+
 STOP_CHARS_RE = re.compile(r"[^a-z0-9]+")
 
 
@@ -43,6 +46,39 @@ def mnemonic_from_content(content: str, word_limit: int = 6) -> str:
     return slugify(mnemonic)
 
 
+class MnemonicRegistry:
+    """Assign collision-free mnemonics to turns in the order they are seen."""
+
+    def __init__(self) -> None:
+        self.seen: Dict[str, bool] = {}
+
+    def claim(self, base: str) -> str:
+        suffix = ""
+        counter = 0
+        slug = base
+        while slug in self.seen:
+            counter += 1
+            if counter <= 26:
+                suffix = f"-{chr(ord('a') + counter - 1)}"
+            else:
+                suffix = f"-{counter:02d}"
+            slug = base
+            if len(base) + len(suffix) > 60:
+                slug = base[: 60 - len(suffix)].rstrip("-")
+            slug = f"{slug}{suffix}"
+        self.seen[slug] = True
+        return slug
+
+    def stabilize(self, turn: "Turn") -> None:
+        turn.mnemonic = self.claim(turn.mnemonic or mnemonic_from_content(turn.content))
+
+
+def stabilize_mnemonics(turns: Iterable["Turn"]) -> None:
+    mnemonics = MnemonicRegistry()
+    for turn in turns:
+        mnemonics.stabilize(turn)
+
+
 def ensure_timezone(dt: Optional[datetime], timezone: Optional[str]) -> Optional[datetime]:
     if dt is None:
         return None
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
+import io
+import json
+import sys
+import tarfile
+import time
+import zipfile
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import BinaryIO, Dict, Optional, TextIO, Tuple
 
-from .models import Conversation
-from .renderers.parent import render_parent
+from .knots import segment_turns
+from .models import Conversation, Turn
+from .renderers.knot import render_knot
+from .renderers.parent import knot_filename, render_parent, render_parent_shards, turn_filename
+from .renderers.template import compile_parent_template, compile_turn_template
 from .renderers.turn import render_turn
 
 
@@ -17,9 +27,22 @@ class Plan:
 
 
 class OutputWriter:
-    def __init__(self, output_dir: Path, parent_name: str = "Conversation.md"):
+    def __init__(
+        self,
+        output_dir: Path,
+        parent_name: str = "Conversation.md",
+        shard_size: Optional[int] = None,
+        turn_template: Optional[str] = None,
+        parent_template: Optional[str] = None,
+        knots: bool = False,
+    ):
         self.output_dir = output_dir
         self.parent_name = parent_name
+        self.shard_size = shard_size
+        self.knots = knots
+        # User templates are compiled once (and cached) into renderers with the built-in signatures.
+        self.render_turn = compile_turn_template(turn_template) if turn_template else render_turn
+        self.render_parent = compile_parent_template(parent_template) if parent_template else render_parent
 
     def prepare(self, plan: "Plan", force: bool = False) -> None:
         # Ensure all parent directories exist before attempting to write files.
@@ -39,17 +62,208 @@ class OutputWriter:
 
     def plan(self, conversation: Conversation) -> Plan:
         files: Dict[Path, str] = {}
-        parent_content = render_parent(conversation, parent_name=self.parent_name)
+        knots = segment_turns(conversation.turns) if self.knots else None
+        parent_content = self.render_parent(
+            conversation, parent_name=self.parent_name, shard_size=self.shard_size, knots=knots
+        )
         files[self.output_dir / self.parent_name] = parent_content
+        if self.shard_size:
+            shards = render_parent_shards(conversation, parent_name=self.parent_name, shard_size=self.shard_size)
+            for filename, content in shards.items():
+                files[self.output_dir / filename] = content
+        for knot in knots or []:
+            files[self.output_dir / knot_filename(knot)] = render_knot(knot, parent_name=self.parent_name)
         for turn in conversation.turns:
-            filename = f"turn{turn.turn_index:03d}_{turn.mnemonic}.md"
-            content = render_turn(turn, conversation, parent_name=self.parent_name)
-            files[self.output_dir / filename] = content
+            content = self.render_turn(turn, conversation, parent_name=self.parent_name)
+            files[self.output_dir / turn_filename(turn)] = content
         return Plan(files)
 
     def write(self, plan: Plan) -> None:
         for path, content in plan.files.items():
-            path.write_text(content, encoding="utf-8", newline="\n")
+            data = content.encode("utf-8")
+            # Leave identical files untouched so re-runs do not churn mtimes or vault indexes.
+            if _has_content(path, data):
+                continue
+            path.write_bytes(data)
+
+
+def _has_content(path: Path, data: bytes) -> bool:
+    try:
+        if path.stat().st_size != len(data):
+            return False
+        return path.read_bytes() == data
+    except OSError:
+        return False
+
+
+ARCHIVE_FORMATS = ("zip", "tar", "tar.gz", "tar.bz2", "tar.xz")
+ARCHIVE_SUFFIXES = {
+    ".zip": "zip",
+    ".tar": "tar",
+    ".tar.gz": "tar.gz",
+    ".tgz": "tar.gz",
+    ".tar.bz2": "tar.bz2",
+    ".tar.xz": "tar.xz",
+}
+# Archive output written to stdout.
+STDOUT = Path("-")
+
+
+class ArchiveOutputWriter(OutputWriter):
+    """Stream a plan into one zip or tar archive, or to stdout, without staging files on disk."""
+
+    def __init__(
+        self,
+        archive_path: Path,
+        archive_format: str,
+        parent_name: str = "Conversation.md",
+        shard_size: Optional[int] = None,
+        turn_template: Optional[str] = None,
+        parent_template: Optional[str] = None,
+        knots: bool = False,
+    ):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format {archive_format!r}")
+        # Plan paths become member names relative to the archive root.
+        super().__init__(
+            Path(),
+            parent_name=parent_name,
+            shard_size=shard_size,
+            turn_template=turn_template,
+            parent_template=parent_template,
+            knots=knots,
+        )
+        self.archive_path = archive_path
+        self.archive_format = archive_format
+
+    def prepare(self, plan: "Plan", force: bool = False) -> None:
+        if self.archive_path == STDOUT:
+            return
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.archive_path.exists() and not force:
+            raise FileExistsError(
+                "Output would overwrite existing files: "
+                f"{self.archive_path}. Use --force to overwrite these files."
+            )
+
+    def write(self, plan: Plan) -> None:
+        if self.archive_path == STDOUT:
+            self._write_archive(plan, sys.stdout.buffer)
+            sys.stdout.buffer.flush()
+            return
+        with self.archive_path.open("wb") as stream:
+            self._write_archive(plan, stream)
+
+    def _write_archive(self, plan: Plan, stream: BinaryIO) -> None:
+        mtime = time.time()
+        if self.archive_format == "zip":
+            # zipfile falls back to data descriptors on unseekable streams such as pipes.
+            with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+                date_time = time.localtime(mtime)[:6]
+                for path, content in plan.files.items():
+                    info = zipfile.ZipInfo(path.as_posix(), date_time=date_time)
+                    info.compress_type = zipfile.ZIP_DEFLATED
+                    archive.writestr(info, content.encode("utf-8"))
+            return
+
+        compression = self.archive_format.partition(".")[2]
+        with tarfile.open(fileobj=stream, mode=f"w|{compression}") as archive:
+            for path, content in plan.files.items():
+                data = content.encode("utf-8")
+                info = tarfile.TarInfo(path.as_posix())
+                info.size = len(data)
+                info.mtime = int(mtime)
+                info.mode = 0o644
+                archive.addfile(info, io.BytesIO(data))
+
+
+def archive_format_for(output: Path) -> Optional[str]:
+    if output == STDOUT:
+        return "tar"
+    name = output.name.lower()
+    for suffix, archive_format in ARCHIVE_SUFFIXES.items():
+        if name.endswith(suffix):
+            return archive_format
+    return None
+
+
+def create_writer(
+    output: Path,
+    *,
+    parent_name: str = "Conversation.md",
+    archive_format: Optional[str] = None,
+    shard_size: Optional[int] = None,
+    turn_template: Optional[str] = None,
+    parent_template: Optional[str] = None,
+    knots: bool = False,
+) -> OutputWriter:
+    """Pick a directory or archive backend; archives are recognized by suffix or ``-`` for stdout."""
+    archive_format = archive_format or archive_format_for(output)
+    options = dict(
+        shard_size=shard_size, turn_template=turn_template, parent_template=parent_template, knots=knots
+    )
+    if archive_format:
+        return ArchiveOutputWriter(output, archive_format, parent_name=parent_name, **options)
+    return OutputWriter(output, parent_name=parent_name, **options)
+
+
+class JsonLinesWriter:
+    """Stream a conversation as newline-delimited JSON records."""
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+        self.turn_count = 0
+        self._participants: Dict[str, None] = {}
+
+    def write_conversation(self, conversation: Conversation) -> None:
+        self._emit(
+            {
+                "type": "conversation",
+                "title": conversation.title,
+                "model": conversation.model,
+                "conversation_id": conversation.conversation_id,
+                "exported_at": _isoformat(conversation.exported_at),
+            }
+        )
+
+    def write_turn(self, turn: Turn) -> None:
+        self.turn_count += 1
+        if turn.author:
+            self._participants.setdefault(turn.author)
+        self._emit(turn_record(turn))
+
+    def close(self) -> None:
+        self._emit(
+            {
+                "type": "summary",
+                "turn_count": self.turn_count,
+                "participants": list(self._participants),
+            }
+        )
+        self.stream.flush()
+
+    def _emit(self, record: Dict[str, object]) -> None:
+        self.stream.write(json.dumps(record, ensure_ascii=False))
+        self.stream.write("\n")
+
+
+def turn_record(turn: Turn) -> Dict[str, object]:
+    return {
+        "type": "turn",
+        "turn_index": turn.turn_index,
+        "turn_id": turn.turn_id,
+        "role": turn.role,
+        "author": turn.author,
+        "created_at": _isoformat(turn.created_at),
+        "data_turn": turn.data_turn,
+        "mnemonic": turn.mnemonic,
+        "content": turn.content,
+        "links": [{"text": link.text, "href": link.href} for link in turn.links],
+    }
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
 
 
 def build_files(conversation: Conversation, output_dir: Path, parent_name: str = "Conversation.md") -> Tuple[Plan, OutputWriter]:
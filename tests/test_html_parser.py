@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+import mmap
 from pathlib import Path
 
-from knotly.parsers.html_input import parse_html_export
+import pytest
+
+from knotly.models import Link
+from knotly.parsers import html_input
+from knotly.parsers.html_input import CONTENT_FORMATS, Node, _collect_text, parse_html_export
+from knotly.parsers.layouts import Layout, LayoutTable, layout_fingerprint
+from knotly.parsers.limits import ResourceGuard, ResourceLimitExceeded, ResourceLimits
+from knotly.parsers.markdown import html_to_markdown
+from knotly.parsers.prescan import find_regions
+from knotly.parsers.profiles import ExtractorProfile, SelectorSet, load_profile
+from knotly.parsers.selection import TurnSelection, parse_turn_ranges
+from knotly.parsers.traversal import SKIP, STOP, walk
 from knotly.renderers.turn import render_turn
 
 
@@ -87,3 +99,478 @@ def test_render_turn_keeps_ordered_list_paragraphs_nested(tmp_path: Path) -> Non
 
     assert "[← Back to Conversation]" not in rendered
     assert "1. Day 1-2:\n\n    Start by softening the wax." in rendered
+
+
+def test_prescan_matches_full_parse(tmp_path: Path) -> None:
+    html = """
+    <html><head><title>Prescan</title><script>var css = "[data-message-id]";</script></head>
+    <body>
+      <nav>Sidebar</nav>
+      <div class="conversation-turn" data-message-id="p1" data-role="user" data-turn="user">
+        <div class="message-content"><p>First <a href="https://example.com">link</a></p></div>
+      </div>
+      <div class="conversation-turn" data-message-id="p2" data-role="assistant" data-turn="assistant">
+        <div class="message-content"><p>Second</p>trailing</div>
+      </div>
+      <script>window.bundle = "<div data-message-id='fake'></div>";</script>
+    </body></html>
+    """
+    html_path = tmp_path / "prescan.html"
+    html_path.write_text(html, encoding="utf-8")
+
+    full = parse_html_export(html_path, by_title=True)
+    scanned = parse_html_export(html_path, by_title=True, prescan=True)
+
+    assert scanned == full
+    assert scanned.title == "Prescan"
+    assert [turn.turn_id for turn in scanned.turns] == ["p1", "p2"]
+
+
+def test_prescan_keeps_ancestor_attributes_and_skips_script_bundles(tmp_path: Path) -> None:
+    html = """
+    <html><head><title>Wrapped</title><meta charset="utf-8"></head>
+    <body><nav>Sidebar<br>links</nav>
+      <main id="thread"><!-- <div id="comment"> -->
+        <article id="t1" data-timestamp="2024-03-01T10:00:00Z"><section>
+          <div data-message-author-role="user"><div class="message-content">Hello</div></div>
+        </section></article>
+        <article id="t2" data-timestamp="2024-03-01T10:05:00Z"><section>
+          <div data-message-author-role="assistant"><div class="message-content">Hi</div></div>
+        </section></article>
+      </main>
+      <script>window.__state = {"data-message-author-role": "assistant"};</script>
+      <footer>After the bundle</footer>
+    </body></html>
+    """
+    html_path = tmp_path / "wrapped.html"
+    html_path.write_text(html, encoding="utf-8")
+
+    full = parse_html_export(html_path, by_title=True)
+    scanned = parse_html_export(html_path, by_title=True, prescan=True)
+
+    assert scanned == full
+    assert [turn.turn_id for turn in scanned.turns] == ["t1", "t2"]
+    assert scanned.turns[0].created_at is not None
+
+    data = html_path.read_bytes()
+    with html_path.open("rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        regions = find_regions(buffer)
+    assert regions[-1][1] == data.index(b"<script>window")
+    assert [data[start:end] for start, end in regions if data[start:start + 6] in (b"<main ", b"<artic")] == [
+        b'<main id="thread">',
+        b'<article id="t1" data-timestamp="2024-03-01T10:00:00Z">',
+    ]
+
+
+def test_prescan_keeps_inline_scripts_in_the_last_message(tmp_path: Path) -> None:
+    html = """
+    <html><body>
+      <div data-message-author-role="user" data-message-id="s1"><div class="message-content">Question</div></div>
+      <div data-message-author-role="assistant" data-message-id="s2"><div class="message-content">
+        <p>Answer start</p><script>var x=1;</script><p><br>Answer end that matters</p>
+      </div></div>
+      <script>window.__state = {"data-message-id": "late"};</script>
+    </body></html>
+    """
+    html_path = tmp_path / "inline-script.html"
+    html_path.write_text(html, encoding="utf-8")
+
+    full = parse_html_export(html_path)
+    scanned = parse_html_export(html_path, prescan=True)
+
+    assert scanned == full
+    assert scanned.turns[-1].content.endswith("Answer end that matters")
+
+
+def test_prescan_falls_back_without_markers(tmp_path: Path) -> None:
+    html = "<html><body><div class='text-base'><p>Only text-base</p></div></body></html>"
+    html_path = tmp_path / "fallback.html"
+    html_path.write_text(html, encoding="utf-8")
+
+    conversation = parse_html_export(html_path, prescan=True)
+
+    assert [turn.content for turn in conversation.turns] == ["Only text-base"]
+
+
+def test_selector_set_classifies_in_one_lookup() -> None:
+    selectors = SelectorSet(
+        {
+            "message": "div[data-role], article.turn",
+            "link": "a[href]",
+            "testid": "[data-testid^=conversation-turn-]",
+        }
+    )
+    flags = selectors.flags
+
+    assert selectors.classify("div", {"data-role": "user"}) == flags["message"]
+    assert selectors.classify("div", {"data-role": ""}) == 0
+    assert selectors.classify("article", {"class": "x turn", "data-testid": "conversation-turn-3"}) == (
+        flags["message"] | flags["testid"]
+    )
+    assert selectors.classify("a", {"href": "https://example.com"}) == flags["link"]
+
+
+def test_custom_extractor_profile(tmp_path: Path) -> None:
+    html = """
+    <main>
+      <section class="bubble" data-speaker="human" data-uid="m1">
+        <div class="body">Question <a href="https://example.com/q">here</a></div>
+      </section>
+      <section class="bubble" data-speaker="bot" data-uid="m2">
+        <div class="body">Answer</div>
+      </section>
+    </main>
+    """
+    html_path = tmp_path / "custom.html"
+    html_path.write_text(html, encoding="utf-8")
+    profile = ExtractorProfile(
+        name="bubbles",
+        message="section.bubble",
+        key_attributes=("data-uid",),
+        content="div.body",
+        role_attributes=("data-speaker",),
+        turn_id_attributes=("data-uid",),
+    )
+
+    conversation = parse_html_export(html_path, profile=profile)
+
+    assert [(turn.turn_id, turn.role, turn.content) for turn in conversation.turns] == [
+        ("m1", "human", "Question here"),
+        ("m2", "bot", "Answer"),
+    ]
+    assert [link.href for link in conversation.turns[0].links] == ["https://example.com/q"]
+
+
+def test_legacy_chatgpt_profile_alternates_roles(tmp_path: Path) -> None:
+    row = (
+        '<div class="group w-full" data-testid="conversation-turn-{n}"><div class="flex p-4 gap-4 text-base">'
+        '<div class="min-h-[20px] flex flex-col whitespace-pre-wrap">{body}</div></div></div>'
+    )
+    html_path = tmp_path / "legacy.html"
+    html_path.write_text(
+        "<html><body>"
+        + row.format(n=2, body="How do I descale a kettle?")
+        + row.format(n=3, body='<div class="markdown prose"><p>Use <b>citric acid</b>.</p></div>')
+        + "</body></html>",
+        encoding="utf-8",
+    )
+
+    conversation = parse_html_export(html_path, profile="chatgpt-legacy")
+
+    assert [(turn.turn_id, turn.role, turn.content) for turn in conversation.turns] == [
+        ("conversation-turn-2", "user", "How do I descale a kettle?"),
+        ("conversation-turn-3", "assistant", "Use citric acid."),
+    ]
+
+
+def test_load_profile_from_json(tmp_path: Path) -> None:
+    profile = load_profile(Path(__file__).resolve().parents[1] / "examples" / "profiles" / "bubbles.json")
+    assert profile.key_attributes == ("data-uid",)
+    assert profile.priorities == (("section.bubble[data-speaker]", 1),)
+
+    for content, error in (
+        ('{"name": "x", "message": "div", "colour": "red"}', "unknown profile fields colour"),
+        ('{"name": "x"}', "missing message"),
+        ('{"name": "x", "message": "div > p"}', "Unsupported selector"),
+    ):
+        path = tmp_path / "profile.json"
+        path.write_text(content, encoding="utf-8")
+        with pytest.raises(ValueError, match=error):
+            load_profile(path)
+
+
+def test_parallel_extraction_matches_serial(tmp_path: Path) -> None:
+    turns = []
+    for idx in range(12):
+        turns.append(
+            f"""
+    <div class="conversation-turn" data-message-id="m{idx}" data-role="{'user' if idx % 2 else 'assistant'}">
+      <div class="message-content">
+        <p>Turn {idx} &amp; friends<br>next line</p>
+        <ol><li><p>Step</p><p>Detail <a href="https://example.com/{idx}">ref {idx}</a></p></li></ol>
+        {'<p>stray</span> tail</p>' if idx == 5 else ''}
+      </div>
+    </div>"""
+        )
+    html_path = tmp_path / "parallel.html"
+    html_path.write_text("<html><body>" + "".join(turns) + "\n</body></html>", encoding="utf-8")
+
+    serial = parse_html_export(html_path)
+    parallel = parse_html_export(html_path, workers=2)
+
+    assert len(parallel.turns) == len(serial.turns)
+    assert parallel == serial
+
+
+def test_selection_keeps_full_build_numbering(tmp_path: Path, monkeypatch) -> None:
+    turns = "".join(
+        f'<div class="conversation-turn" data-message-id="m{idx}" data-role="{"user" if idx % 2 else "assistant"}">'
+        f'<div class="message-content"><p>Turn {idx}</p></div></div>'
+        for idx in range(10)
+    )
+    html_path = tmp_path / "selection.html"
+    html_path.write_text(f"<html><body>{turns}</body></html>", encoding="utf-8")
+    full = parse_html_export(html_path)
+
+    collected = []
+    collect_text = html_input._collect_text
+    monkeypatch.setattr(html_input, "_collect_text", lambda node: collected.append(node) or collect_text(node))
+    selection = TurnSelection(ranges=parse_turn_ranges("2-6,9-"), roles=("assistant",))
+    selected = parse_html_export(html_path, selection=selection)
+
+    assert [turn.turn_index for turn in selected.turns] == [3, 5, 9]
+    assert selected.turns == [full.turns[idx - 1] for idx in (3, 5, 9)]
+    # Excluded turns are never read.
+    assert len(collected) == 3
+    assert parse_html_export(html_path, selection=selection, workers=2).turns == selected.turns
+
+
+def test_selection_suffixes_mnemonics_among_selected_turns(tmp_path: Path) -> None:
+    html_path = tmp_path / "same-topic.html"
+    html_path.write_text(
+        "<html><body>"
+        '<div data-message-id="m1" data-role="user"><div class="message-content">Bread recipe</div></div>'
+        '<div data-message-id="m2" data-role="user"><div class="message-content">Bread recipe</div></div>'
+        '<div data-message-id="m3" data-role="user"><div class="message-content">Bread recipe</div></div>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    selection = TurnSelection(ranges=parse_turn_ranges("2-3"))
+    for content_format in CONTENT_FORMATS:
+        full = parse_html_export(html_path, content_format=content_format)
+        selected = parse_html_export(html_path, selection=selection, content_format=content_format)
+        assert [turn.mnemonic for turn in full.turns] == ["bread-recipe", "bread-recipe-a", "bread-recipe-b"]
+        assert [(turn.turn_index, turn.mnemonic) for turn in selected.turns] == [(2, "bread-recipe"), (3, "bread-recipe-a")]
+
+
+def test_parse_turn_ranges() -> None:
+    assert parse_turn_ranges("5, 10-20,500-") == ((5, 5), (10, 20), (500, None))
+    for invalid in ("0", "9-3", "x", ","):
+        with pytest.raises(ValueError):
+            parse_turn_ranges(invalid)
+
+
+def test_resource_guard_counts_and_stops(tmp_path: Path) -> None:
+    html_path = tmp_path / "guarded.html"
+    html_path.write_text(
+        '<html><body><div class="conversation-turn" data-role="user">'
+        '<div class="message-content"><p>Hello <b>there</b></p></div></div></body></html>',
+        encoding="utf-8",
+    )
+    guard = ResourceGuard()
+    conversation = parse_html_export(html_path, guard=guard)
+    assert conversation.turns[0].content == "Hello there"
+    assert guard.usage.input_bytes == html_path.stat().st_size
+    assert (guard.usage.nodes, guard.usage.max_depth, guard.usage.max_turn_chars) == (6, 6, 11)
+
+    for limits, name in (
+        (ResourceLimits(max_input_bytes=100), "input bytes"),
+        (ResourceLimits(max_nodes=5), "node count"),
+        (ResourceLimits(max_depth=4), "nesting depth"),
+        (ResourceLimits(max_turn_chars=10), "turn length"),
+    ):
+        with pytest.raises(ResourceLimitExceeded) as excinfo:
+            parse_html_export(html_path, guard=ResourceGuard(limits))
+        assert excinfo.value.limit == name
+
+
+def test_layout_table_learns_and_reuses_strategy(tmp_path: Path) -> None:
+    html_path = tmp_path / "layout.html"
+    html_path.write_text(
+        '<html><body><main>'
+        '<div data-message-author-role="user" data-message-id="m1"><div class="markdown">Hi</div></div>'
+        '<div data-message-author-role="assistant" data-message-id="m2"><div class="markdown">Hello</div></div>'
+        "</main></body></html>",
+        encoding="utf-8",
+    )
+    expected = [(turn.role, turn.content) for turn in parse_html_export(html_path).turns]
+    table_path = tmp_path / "layouts.json"
+
+    layouts = LayoutTable(table_path)
+    conversation = parse_html_export(html_path, layouts=layouts)
+    assert [(turn.role, turn.content) for turn in conversation.turns] == expected
+    assert (layouts.known, layouts.learned) == (0, 1)
+    layouts.save()
+
+    layouts = LayoutTable(table_path)
+    fingerprint = layout_fingerprint(html_path, html_input.get_profile("chatgpt").profile)
+    assert layouts.layouts[fingerprint].message
+    conversation = parse_html_export(html_path, layouts=layouts)
+    assert [(turn.role, turn.content) for turn in conversation.turns] == expected
+    assert (layouts.known, layouts.learned) == (1, 0)
+
+    # A stale strategy that no longer finds messages is dropped and relearned.
+    layouts.learn(fingerprint, Layout(message="article.gone"))
+    conversation = parse_html_export(html_path, layouts=layouts)
+    assert [(turn.role, turn.content) for turn in conversation.turns] == expected
+    assert layouts.layouts[fingerprint].message != "article.gone"
+
+
+def test_layout_table_keeps_dedup_for_nested_pages(tmp_path: Path) -> None:
+    flat = tmp_path / "flat.html"
+    flat.write_text(
+        '<html><body>'
+        '<div data-message-author-role="user" data-message-id="a1">hello</div>'
+        '<div data-message-author-role="assistant" data-message-id="a2">hi there</div>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    nested = tmp_path / "nested.html"
+    nested.write_text(
+        '<html><body>'
+        '<div data-message-id="b1"><div data-message-author-role="user">hello</div></div>'
+        '<div data-message-id="b2"><div data-message-author-role="assistant">hi there</div></div>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    profile = html_input.get_profile("chatgpt").profile
+    assert layout_fingerprint(flat, profile) == layout_fingerprint(nested, profile)
+
+    expected = [(turn.role, turn.content) for turn in parse_html_export(nested).turns]
+    assert len(expected) == 2
+    layouts = LayoutTable()
+    parse_html_export(flat, layouts=layouts)
+    conversation = parse_html_export(nested, layouts=layouts)
+    assert [(turn.role, turn.content) for turn in conversation.turns] == expected
+
+
+def test_layout_table_keeps_tag_variants_for_shared_fingerprint(tmp_path: Path) -> None:
+    divs = tmp_path / "divs.html"
+    divs.write_text(
+        '<html><body>'
+        '<div data-message-id="a1" data-role="user">Question</div>'
+        '<div data-message-id="a2" data-role="assistant">Answer</div>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    mixed = tmp_path / "mixed.html"
+    mixed.write_text(
+        '<html><body>'
+        '<div data-message-id="b1" data-role="user">Question one</div>'
+        '<article data-message-id="b2" data-role="assistant">Answer one</article>'
+        '<section data-message-id="b3" data-role="user">Question two</section>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    profile = html_input.get_profile("chatgpt").profile
+    assert layout_fingerprint(divs, profile) == layout_fingerprint(mixed, profile)
+
+    expected = [turn.content for turn in parse_html_export(mixed).turns]
+    assert len(expected) == 3
+    layouts = LayoutTable()
+    parse_html_export(divs, layouts=layouts)
+    conversation = parse_html_export(mixed, layouts=layouts)
+    assert [turn.content for turn in conversation.turns] == expected
+    assert layouts.known == 1
+
+
+def test_resource_guard_depth_ignores_void_elements(tmp_path: Path) -> None:
+    html_path = tmp_path / "breaks.html"
+    lines = "".join(f"line {idx}<br>" for idx in range(500))
+    html_path.write_text(
+        '<html><head><meta charset="utf-8"><link rel="icon" href="x.ico"></head><body>'
+        f'<div class="conversation-turn" data-role="user"><div class="message-content"><p>{lines}</p></div></div>'
+        "</body></html>",
+        encoding="utf-8",
+    )
+    guard = ResourceGuard(ResourceLimits(max_depth=10))
+    conversation = parse_html_export(html_path, guard=guard)
+    assert conversation.turns[0].content.startswith("line 0\nline 1\n")
+    assert guard.usage.max_depth == 6
+
+
+def test_markdown_content_format(tmp_path: Path) -> None:
+    html_path = tmp_path / "markdown.html"
+    html_path.write_text(
+        """<html><body>
+<div data-message-author-role="assistant" data-message-id="m1"><div class="markdown">
+<h2>Setup <em>notes</em></h2>
+<p>Use <code>pip install</code> and   see <a href="https://example.com/docs">the docs</a>.<br>Next line</p>
+<pre><div><span>python</span><button>Copy code</button></div><code class="hljs language-python">def f(x):
+    return x  *  2
+
+
+print(f(2))
+</code></pre>
+<table><thead><tr><th>Name</th><th>Value | pipe</th></tr></thead>
+<tbody><tr><td>a</td><td><strong>1</strong></td></tr></tbody></table>
+<ol start="3"><li>three</li><li>four<ul><li>nested</li></ul></li></ol>
+</div></div>
+</body></html>""",
+        encoding="utf-8",
+    )
+
+    conversation = parse_html_export(html_path, content_format="markdown")
+    turn = conversation.turns[0]
+    assert turn.content == (
+        "## Setup *notes*\n\n"
+        "Use `pip install` and see [the docs](https://example.com/docs).\nNext line\n\n"
+        "```python\ndef f(x):\n    return x  *  2\n\n\nprint(f(2))\n```\n\n"
+        "| Name | Value \\| pipe |\n| --- | --- |\n| a | **1** |\n\n"
+        "3. three\n4. four\n   - nested"
+    )
+    assert [(link.text, link.href) for link in turn.links] == [("the docs", "https://example.com/docs")]
+    assert parse_html_export(html_path, content_format="markdown", workers=2).turns == conversation.turns
+
+
+def test_markdown_escapes_literal_syntax(tmp_path: Path) -> None:
+    html_path = tmp_path / "literal.html"
+    html_path.write_text(
+        '<html><body><div data-message-author-role="user" data-message-id="m1"><div class="markdown">'
+        "<p># not a heading</p><p>1. not a list<br>- nor this</p>"
+        '<p>literal *stars*, [x](y) and <a href="https://example.com">snake_case</a></p>'
+        "<ul><li>&gt; quoted</li></ul><p><b>Step</b> 2. stays</p><pre><code># kept *as is*</code></pre>"
+        "</div></div></body></html>",
+        encoding="utf-8",
+    )
+    turn = parse_html_export(html_path, content_format="markdown").turns[0]
+    assert turn.content == (
+        "\\# not a heading\n\n1\\. not a list\n\\- nor this\n\n"
+        "literal \\*stars\\*, \\[x](y) and [snake\\_case](https://example.com)\n\n"
+        "- \\> quoted\n\n**Step** 2. stays\n\n```\n# kept *as is*\n```"
+    )
+    assert [link.text for link in turn.links] == ["snake_case"]
+
+
+def test_traversal_handles_100k_deep_nesting() -> None:
+    root = current = Node(tag="div", attrs={})
+    for level in range(100_000):
+        child = Node(tag="span" if level % 2 else "div", attrs={}, parent=current)
+        current.add_child(child)
+        current = child
+    current.add_text("bottom")
+    link = Node(tag="a", attrs={"href": "https://example.com"}, parent=current)
+    current.add_child(link)
+    link.add_text("link")
+
+    assert root.iter_text() == ["bottom", "link"]
+    assert root.find_all(lambda node: node.tag == "a") == [link]
+    assert root.find_first(lambda node: node.tag == "span").tag == "span"
+    assert _collect_text(root) == "bottomlink"
+    assert html_to_markdown(root, lambda tag, attrs: tag == "a") == (
+        "bottom[link](https://example.com)",
+        [Link(text="link", href="https://example.com")],
+    )
+
+
+def test_walk_supports_skip_stop_and_postorder() -> None:
+    root = Node(tag="div", attrs={})
+    for name in ("a", "b", "c"):
+        child = Node(tag=name, attrs={}, parent=root)
+        root.add_child(child)
+        child.add_child(Node(tag=f"{name}-inner", attrs={}, parent=child))
+
+    entered, left = [], []
+
+    def enter(node: Node) -> object:
+        entered.append(node.tag)
+        if node.tag == "b":
+            return SKIP
+        if node.tag == "c-inner":
+            return STOP
+        return None
+
+    walk(root, enter, lambda node: left.append(node.tag))
+
+    assert entered == ["div", "a", "a-inner", "b", "c", "c-inner"]
+    assert left == ["a-inner", "a"]
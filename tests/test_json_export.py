@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from knotly.parsers import json_export
+from knotly.parsers.json_export import active_branch, conversation_from_export, iter_export_conversations
+from knotly.parsers.limits import ResourceLimitExceeded, ResourceLimits
+from knotly.parsers.selection import TurnSelection
+from knotly.pipeline import build_export
+
+
+def message_node(node_id, parent, children, role=None, text="", create_time=None, **message_fields):
+    message = None
+    if role:
+        message = {
+            "id": node_id,
+            "author": {"role": role, "name": None},
+            "create_time": create_time,
+            "content": {"content_type": "text", "parts": [text]},
+            "metadata": {},
+        }
+        message.update(message_fields)
+    return {"id": node_id, "parent": parent, "children": children, "message": message}
+
+
+def sample_conversation(title: str = "Bread", conversation_id: str = "c0ffee00-1234") -> dict:
+    mapping = {
+        "root": message_node("root", None, ["system"]),
+        "system": message_node("system", "root", ["u1"], "system", "You are ChatGPT"),
+        "u1": message_node("u1", "system", ["a1-old", "a1"], "user", "How do I bake bread?", 1700000000),
+        "a1-old": message_node("a1-old", "u1", [], "assistant", "An abandoned branch"),
+        "a1": message_node(
+            "a1",
+            "u1",
+            ["tool"],
+            "assistant",
+            "Knead it. See [the guide](https://example.com/bread).",
+            1700000060,
+            metadata={"model_slug": "gpt-4o"},
+        ),
+        "tool": message_node("tool", "a1", ["u2"], "assistant", "search('bread')", recipient="browser"),
+        "u2": message_node("u2", "tool", [], "user", "Thanks!", 1700000120),
+    }
+    return {"title": title, "id": conversation_id, "current_node": "u2", "mapping": mapping}
+
+
+def test_iter_export_conversations_reads_incrementally(tmp_path: Path, monkeypatch) -> None:
+    conversations = [sample_conversation(f"Chat {idx}", f"id-{idx}") for idx in range(5)]
+    path = tmp_path / "conversations.json"
+    path.write_text(json.dumps(conversations, indent=2), encoding="utf-8")
+    monkeypatch.setattr(json_export, "READ_CHUNK_SIZE", 7)
+
+    assert list(iter_export_conversations(path)) == conversations
+
+
+def test_active_branch_follows_current_node() -> None:
+    raw = sample_conversation()
+    assert [node["id"] for node in active_branch(raw)] == ["root", "system", "u1", "a1", "tool", "u2"]
+
+    raw.pop("current_node")
+    assert [node["id"] for node in active_branch(raw)][-1] == "u2"
+
+
+def test_conversation_from_export_keeps_visible_turns() -> None:
+    conversation = conversation_from_export(sample_conversation(), timezone="UTC")
+
+    assert conversation.title == "Bread"
+    assert conversation.model == "gpt-4o"
+    assert [(turn.turn_index, turn.role, turn.content) for turn in conversation.turns] == [
+        (1, "user", "How do I bake bread?"),
+        (2, "assistant", "Knead it. See [the guide](https://example.com/bread)."),
+        (3, "user", "Thanks!"),
+    ]
+    assert conversation.turns[1].links[0].href == "https://example.com/bread"
+    assert conversation.turns[0].created_at.isoformat() == "2023-11-14T22:13:20+00:00"
+    assert conversation.participants == ["User", "Assistant"]
+
+
+def test_build_export_parallel_matches_serial(tmp_path: Path) -> None:
+    path = tmp_path / "conversations.json"
+    path.write_text(
+        json.dumps([sample_conversation(f"Chat {idx}", f"{idx:08d}-uuid") for idx in range(6)]),
+        encoding="utf-8",
+    )
+
+    serial = build_export(input_path=path, output_dir=tmp_path / "serial")
+    parallel = build_export(input_path=path, output_dir=tmp_path / "parallel", workers=2)
+
+    assert [result.output_dir.name for result in serial] == [result.output_dir.name for result in parallel]
+    assert serial[0].output_dir.name == "chat-0-00000000"
+    for result in serial:
+        other = tmp_path / "parallel" / result.output_dir.name
+        assert sorted(path.name for path in other.iterdir()) == sorted(path.name for path in result.output_dir.iterdir())
+        for note in result.output_dir.iterdir():
+            assert (other / note.name).read_text(encoding="utf-8") == note.read_text(encoding="utf-8")
+
+
+def test_conversation_from_export_applies_selection() -> None:
+    selection = TurnSelection(ranges=((2, None),), roles=("user",))
+    conversation = conversation_from_export(sample_conversation(), selection=selection)
+
+    assert [(turn.turn_index, turn.content) for turn in conversation.turns] == [(3, "Thanks!")]
+    assert conversation.participants == ["User"]
+
+
+def test_build_export_enforces_resource_limits(tmp_path: Path) -> None:
+    path = tmp_path / "conversations.json"
+    path.write_text(json.dumps([sample_conversation(f"Chat {idx}", f"{idx:08d}-uuid") for idx in range(3)]), encoding="utf-8")
+
+    for limits, name, workers in (
+        (ResourceLimits(max_input_bytes=100), "input bytes", 1),
+        (ResourceLimits(max_nodes=20), "node count", 1),
+        (ResourceLimits(max_depth=5), "nesting depth", 1),
+        (ResourceLimits(max_turn_chars=20), "turn length", 1),
+        (ResourceLimits(max_turn_chars=20), "turn length", 2),
+    ):
+        with pytest.raises(ResourceLimitExceeded) as excinfo:
+            build_export(input_path=path, output_dir=tmp_path / "out", limits=limits, workers=workers, force=True)
+        assert excinfo.value.limit == name
+
+    results = build_export(input_path=path, output_dir=tmp_path / "ok", limits=ResourceLimits(max_nodes=21, max_depth=6))
+    assert len(results) == 3
+
+
+def test_conversation_from_export_selection_keeps_mnemonics() -> None:
+    raw = sample_conversation()
+    raw["mapping"]["u2"]["message"]["content"]["parts"] = ["How do I bake bread?"]
+    full = conversation_from_export(raw)
+    selected = conversation_from_export(raw, selection=TurnSelection(ranges=((3, None),)))
+
+    assert [turn.mnemonic for turn in full.turns] == ["how-do-i-bake-bread", "knead-it-see-the-guide", "how-do-i-bake-bread-a"]
+    assert selected.turns == full.turns[2:]
@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import io
+import json
+import os
+import tarfile
+import zipfile
 from pathlib import Path
 
-from knotly.models import Conversation, Turn
-from knotly.pipeline import build_conversation
+import pytest
+
+from knotly.catalog import Catalog
+from knotly.cli import build_command, build_parser, main
+from knotly.console import Console
+from knotly.knots import segment_turns
+from knotly.models import Conversation, Link, Turn
+from knotly.pipeline import build_cataloged, build_conversation, stream_conversation
 from knotly.renderers.parent import render_parent
+from knotly.renderers.template import compile_turn_template
 from knotly.utils import ensure_timezone, parse_datetime
+from knotly.writers import OutputWriter
 
 
 def read_folder(folder: Path) -> dict:
@@ -86,8 +99,8 @@ def test_mnemonic_collision_suffixes():
         participants=["Tester"],
         turns=turns,
     )
-    from knotly.pipeline import _stabilize_mnemonics
-    _stabilize_mnemonics(convo)
+    from knotly.utils import stabilize_mnemonics
+    stabilize_mnemonics(convo.turns)
     mnemonics = [turn.mnemonic for turn in convo.turns]
     assert mnemonics[0] == "repeat-text"
     assert mnemonics[1] == "repeat-text-a"
@@ -154,3 +167,241 @@ def test_turn_content_preserves_line_breaks(tmp_path: Path):
     turn = result.conversation.turns[0]
     assert turn.content == expected
     assert turn.data_turn == "user"
+
+
+def test_jsonl_stream_matches_markdown_build(tmp_path: Path):
+    stream = io.StringIO()
+    count = stream_conversation(
+        input_path=Path("examples/html/conversation.html"),
+        stream=stream,
+        by_title=True,
+    )
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+    assert count == 2
+    assert [record["type"] for record in records] == ["conversation", "turn", "turn", "summary"]
+    assert records[0]["title"] == "ChatGPT Conversation Example"
+    assert records[2]["mnemonic"] == "yes-the-docs-are-live-at"
+    assert records[2]["created_at"] == "2024-02-01T09:16:00+00:00"
+    assert records[2]["links"] == [{"text": "Docs", "href": "https://example.com/docs"}]
+    assert records[3]["participants"] == ["Alice", "GPT"]
+
+
+def test_jsonl_dry_run_writes_nothing(tmp_path: Path, monkeypatch, capsys):
+    out_path = tmp_path / "d.jsonl"
+    monkeypatch.setattr(
+        "sys.argv",
+        ["knotly", "--in", "examples/html/conversation.html", "--out", str(out_path), "--format", "jsonl", "--dry-run"],
+    )
+    main()
+    assert not out_path.exists()
+    assert f"Dry run. Would write 2 turns to {out_path}" in capsys.readouterr().out
+
+
+def test_catalog_skips_processed_inputs_and_appends_index(tmp_path: Path):
+    vault = tmp_path / "vault"
+    index_note = vault / "Conversations.md"
+    first = tmp_path / "first.html"
+    second = tmp_path / "second.html"
+    first.write_text(Path("examples/html/conversation.html").read_text(encoding="utf-8"), encoding="utf-8")
+    second.write_text(
+        "<title>Second</title><div class='conversation-turn' data-role='user'>Hi</div>", encoding="utf-8"
+    )
+
+    with Catalog(vault / ".knotly.db") as catalog:
+        built = build_cataloged(
+            catalog, input_path=first, output_dir=vault / "first", index_note=index_note, by_title=True
+        )
+        skipped = build_cataloged(
+            catalog, input_path=first, output_dir=vault / "first", index_note=index_note, by_title=True
+        )
+        retitled = build_cataloged(
+            catalog, input_path=first, output_dir=vault / "first", index_note=index_note, title="Renamed", force=True
+        )
+        build_cataloged(catalog, input_path=second, output_dir=vault / "second", index_note=index_note, by_title=True)
+        entries = catalog.entries()
+
+    assert built is not None and built.timings["parse"] >= 0
+    assert skipped is None
+    assert retitled is not None
+    assert [entry.turn_count for entry in entries] == [2, 2, 1]
+    assert index_note.read_text(encoding="utf-8").splitlines() == [
+        "# Conversations",
+        "",
+        "- [[first/Conversation.md|Renamed]]",
+        "- [[second/Conversation.md|Second]]",
+    ]
+
+
+@pytest.mark.parametrize("name", ["notes.zip", "notes.tar.gz"])
+def test_archive_output_matches_golden(tmp_path: Path, name: str):
+    archive_path = tmp_path / name
+    build_conversation(
+        input_path=Path("examples/html/conversation.html"),
+        output_dir=archive_path,
+        by_title=True,
+    )
+
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(archive_path) as archive:
+            generated = {member: archive.read(member).decode("utf-8") for member in archive.namelist()}
+    else:
+        with tarfile.open(archive_path) as archive:
+            generated = {
+                member.name: archive.extractfile(member).read().decode("utf-8") for member in archive.getmembers()
+            }
+    assert generated == read_folder(Path("tests/golden/html"))
+    assert sorted(path.name for path in tmp_path.iterdir()) == [name]
+
+    with pytest.raises(FileExistsError):
+        build_conversation(input_path=Path("examples/html/conversation.html"), output_dir=archive_path)
+    build_conversation(input_path=Path("examples/html/conversation.html"), output_dir=archive_path, force=True)
+
+
+def test_sharded_parent_appends_touch_only_last_shard(tmp_path: Path):
+    def page(count: int) -> str:
+        turns = "".join(
+            f"<div class='conversation-turn' data-message-id='m{idx}' data-role='user'>Topic number {idx}</div>"
+            for idx in range(1, count + 1)
+        )
+        return f"<html><body>{turns}</body></html>"
+
+    source = tmp_path / "long.html"
+    out_dir = tmp_path / "out"
+    source.write_text(page(5), encoding="utf-8")
+    build_conversation(input_path=source, output_dir=out_dir, shard_size=2)
+
+    assert (out_dir / "Conversation.md").read_text(encoding="utf-8") == (
+        "## Turns\n\n"
+        "- [[Conversation_turns001-002.md]]\n"
+        "- [[Conversation_turns003-004.md]]\n"
+        "- [[Conversation_turns005-006.md]]\n"
+    )
+    assert (out_dir / "Conversation_turns003-004.md").read_text(encoding="utf-8") == (
+        "## Turns 3-4\n\n- [[turn003_topic-number-3.md]]\n- [[turn004_topic-number-4.md]]\n"
+    )
+
+    for path in out_dir.iterdir():
+        os.utime(path, (0, 0))
+    source.write_text(page(6), encoding="utf-8")
+    build_conversation(input_path=source, output_dir=out_dir, shard_size=2, force=True)
+
+    touched = sorted(path.name for path in out_dir.iterdir() if path.stat().st_mtime != 0)
+    assert touched == ["Conversation_turns005-006.md", "turn006_topic-number-6.md"]
+
+
+def test_templates_render_frontmatter(tmp_path: Path):
+    out_dir = tmp_path / "templated"
+    build_conversation(
+        input_path=Path("examples/html/conversation.html"),
+        output_dir=out_dir,
+        by_title=True,
+        turn_template=Path("examples/templates/turn.md").read_text(encoding="utf-8"),
+        parent_template=Path("examples/templates/parent.md").read_text(encoding="utf-8"),
+    )
+    generated = read_folder(out_dir)
+    golden = read_folder(Path("tests/golden/html"))
+    assert generated.keys() == golden.keys()
+
+    first = generated[sorted(name for name in generated if name.startswith("turn"))[0]]
+    assert first.startswith('---\nconversation: "')
+    assert '\nrole: "user"\n' in first
+    assert '\nup: "[[Conversation]]"\n' in first
+    assert generated["Conversation.md"].startswith("---\ntitle: ")
+    assert '\nparticipants: ["' in generated["Conversation.md"]
+
+    knotted_dir = tmp_path / "knotted"
+    build_conversation(
+        input_path=Path("examples/html/conversation.html"),
+        output_dir=knotted_dir,
+        knots=True,
+        parent_template=Path("examples/templates/parent.md").read_text(encoding="utf-8"),
+    )
+    assert "- [[knot001_" in (knotted_dir / "Conversation.md").read_text(encoding="utf-8")
+
+
+def test_template_rejects_unknown_fields():
+    with pytest.raises(ValueError, match="Unknown template field 'nope'"):
+        compile_turn_template("{{ nope }}")
+    with pytest.raises(ValueError, match="Unknown template filter"):
+        compile_turn_template("{{ role|shout }}")
+    render = compile_turn_template("{literal} {{role|yaml}}")
+    assert "{literal}" in render(
+        Turn(1, None, "user", None, "", None, None), Conversation("t", None, None, None, [], []), parent_name="P.md"
+    )
+
+
+def test_knots_segment_topics_at_user_turns(tmp_path: Path):
+    topics = [
+        ("bread", "flour yeast dough knead oven crust loaf"),
+        ("python", "function class module import dictionary loop exception"),
+        ("garden", "tomato soil compost seeds sunlight mulch harvest"),
+    ]
+    turns = []
+    for topic, words in topics:
+        vocabulary = words.split()
+        for exchange in range(3):
+            question = " ".join(vocabulary[exchange : exchange + 3])
+            answer = " ".join(vocabulary[(exchange + offset) % len(vocabulary)] for offset in range(20))
+            for role, content in (("user", f"{topic} {question}?"), ("assistant", answer)):
+                turns.append(
+                    Turn(len(turns) + 1, None, role, role.title(), content, None, None, mnemonic=f"{topic}-{len(turns)}")
+                )
+    conversation = Conversation("Topics", None, None, None, ["User", "Assistant"], turns)
+
+    knots = segment_turns(conversation.turns)
+    assert [(knot.first_turn, knot.last_turn) for knot in knots] == [(1, 6), (7, 12), (13, 18)]
+    assert all(knot.turns[0].role == "user" for knot in knots)
+
+    writer = OutputWriter(tmp_path, knots=True)
+    plan = writer.plan(conversation)
+    parent = plan.files[tmp_path / "Conversation.md"]
+    assert "## Knots\n\n- [[knot001_bread-0.md]] (turns 1-6)\n" in parent
+    hub = plan.files[tmp_path / "knot002_python-6.md"]
+    assert hub.startswith("# Knot 2: turns 7-12\n\nUp: [[Conversation]]\n")
+    assert "- [[turn012_python-11.md]]" in hub
+
+
+def test_models_are_slotted_and_share_repeated_strings():
+    turns = [
+        Turn(
+            turn_index=i + 1,
+            turn_id=None,
+            role="".join(["assis", "tant"]),
+            author="".join(["Chat", "GPT"]),
+            content="text",
+            raw_content=None,
+            created_at=None,
+            data_turn="".join(["assis", "tant"]),
+            links=[Link(text="docs", href="https://example.com")],
+        )
+        for i in range(2)
+    ]
+    assert turns[0].role is turns[1].role is turns[0].data_turn
+    assert turns[0].author is turns[1].author
+    assert turns[0].links == (Link(text="docs", href="https://example.com"),)
+    assert not hasattr(turns[0], "__dict__")
+    with pytest.raises(AttributeError):
+        turns[0].links[0].href = "https://example.org"
+    turns[0].mnemonic = "assigned-later"
+    assert turns[0].mnemonic == "assigned-later"
+
+
+def test_stdout_output_routes_only_that_runs_logs_to_stderr(monkeypatch, capsys):
+    monkeypatch.setattr(
+        "sys.argv",
+        ["knotly", "--in", "examples/html/conversation.html", "--out", "-", "--format", "jsonl", "--verbose"],
+    )
+    main()
+    captured = capsys.readouterr()
+    assert all(json.loads(line) for line in captured.out.splitlines())
+    assert "[knotly] Streamed 2 turns." in captured.err
+
+    Console().log("later")
+    assert capsys.readouterr().out == "[knotly] later\n"
+
+
+def test_build_command_defaults_its_console(tmp_path: Path, capsys):
+    args = build_parser().parse_args(["--in", "examples/html/conversation.html", "--out", str(tmp_path / "out")])
+    build_command(args)
+    assert capsys.readouterr().out.startswith("Wrote ")